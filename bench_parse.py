@@ -0,0 +1,62 @@
+"""Measure how parallel CSV parsing in estudyo_app.py scales with the number of workers.
+
+Writes a synthetic students.csv (with some quoted, multi-line values) and times
+csv.DictReader against parse_csv_parallel with 1, 2, 4, ... worker processes:
+
+    python bench_parse.py [--rows 1000000] [--max-workers N]
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+import estudyo_app as app
+from bench_storage import make_students
+
+
+def timed(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    rows = make_students(args.rows)
+    for row in rows[::1000]:
+        row["last_name"] = f'{row["last_name"]}, "Jr."\nII'
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "students.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=app.TABLES["students"][1])
+            writer.writeheader()
+            writer.writerows(rows)
+
+        def dict_reader():
+            with open(path, newline="", encoding="utf-8") as f:
+                return list(csv.DictReader(f))
+
+        base, expected = timed(dict_reader)
+        print(f"{args.rows} rows, {os.path.getsize(path) / 1e6:.1f} MB, {os.cpu_count()} CPU(s)")
+        print(f"{'workers':>8} {'seconds':>8} {'speedup':>8}")
+        print(f"{'reader':>8} {base:8.3f} {1:8.2f}")
+        workers = 1
+        while workers <= args.max_workers:
+            app.parse_csv_parallel(path, workers)  # start the pool outside the timing
+            elapsed, result = timed(lambda: app.parse_csv_parallel(path, workers))
+            assert result == expected, f"{workers} workers parsed a different result"
+            print(f"{workers:8d} {elapsed:8.3f} {base / elapsed:8.2f}")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compare plain and compressed table storage in estudyo_app.py.
+
+Writes a synthetic roster in every available format and reports the file size, the
+write time, the cold read time and the time the file would take to come over a share
+of the given bandwidth:
+
+    python bench_storage.py [--rows 200000] [--mbps 100]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import estudyo_app as app
+
+
+def make_students(count, seed=0):
+    rng = random.Random(seed)
+    first = ["Juan", "Maria", "Jose", "Ana", "Mark", "Grace", "Paolo", "Liza", "Carlo", "Joy"]
+    last = ["Santos", "Reyes", "Cruz", "Bautista", "Ocampo", "Garcia", "Mendoza", "Torres", "Lumasag"]
+    programs = ["BSCS", "BSIT", "BSIS", "BSCA", "BSBIO (MARINE)", app.NULL_DISPLAY]
+    return [{"id": f"{2019 + i % 7}-{i // 7 % 10000:04d}",
+             "first_name": rng.choice(first), "last_name": rng.choice(last),
+             "gender": rng.choice(["Male", "Female"]), "program_code": rng.choice(programs),
+             "year_level": str(rng.randint(1, 4))} for i in range(count)]
+
+
+def bench(rows, mbps, directory):
+    fieldnames = app.TABLES["students"][1]
+    formats = [f for f in app.COMPRESSION_FORMATS if f != "zstd" or app.zstandard is not None]
+    results = []
+    for compression in formats:
+        # The functions CSVManager reads and writes every table file with
+        path = os.path.join(directory, f"students-{compression}.csv")
+        start = time.perf_counter()
+        app.write_csv_file(path, fieldnames, rows, compression)
+        write = time.perf_counter() - start
+        start = time.perf_counter()
+        assert len(app.read_csv_file(path)) == len(rows)
+        read = time.perf_counter() - start
+        size = os.path.getsize(path)
+        results.append((compression, size, write, read, size * 8 / (mbps * 1e6)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--mbps", type=float, default=100.0, help="share bandwidth in Mbit/s")
+    args = parser.parse_args()
+
+    rows = make_students(args.rows)
+    with tempfile.TemporaryDirectory() as directory:
+        results = bench(rows, args.mbps, directory)
+    plain = results[0][1]
+    print(f"{args.rows} students, {args.mbps:g} Mbit/s share")
+    print(f"{'format':8} {'bytes':>12} {'ratio':>6} {'write s':>8} {'read s':>8} {'transfer s':>10} {'cold load s':>11}")
+    for compression, size, write, read, transfer in results:
+        print(f"{compression:8} {size:12d} {plain / size:6.1f} {write:8.3f} {read:8.3f} {transfer:10.3f} {read + transfer:11.3f}")
+    if app.zstandard is None:
+        print("zstd skipped: install the 'zstandard' package to include it.")
+
+
+if __name__ == "__main__":
+    main()
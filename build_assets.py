@@ -0,0 +1,95 @@
+"""Build the startup asset cache used by estudyo_app.py.
+
+Compiles estudyo_main.ui (with the app's extra stylesheet baked in) to a Python module
+and pre-renders the tinted sidebar icons and the logo, then records fingerprints of the
+sources in build/manifest.json. The app falls back to the slow path whenever a source
+changes, so re-run this after editing the .ui, the icons or EXTRA_QSS:
+
+    python build_assets.py
+"""
+import io
+import json
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+from PyQt6 import uic
+from PyQt6.QtCore import QSize, Qt
+from PyQt6.QtGui import QGuiApplication, QImage, QImageReader, QPainter
+
+import estudyo_app as app
+
+UI_MODULE = os.path.join(app.ASSET_CACHE_DIR, "estudyo_main_ui.py")
+ICON_DIR = os.path.join(app.ASSET_CACHE_DIR, "icons")
+# 1x and 2x (high-DPI) renders of every sidebar icon
+ICON_SCALES = (1, 2)
+
+
+def compile_ui():
+    """Compile the .ui with EXTRA_QSS appended to the window stylesheet, so it is parsed once."""
+    tree = ET.parse(app.UI_FILE)
+    window = tree.getroot().find("widget")
+    for prop in window.findall("property"):
+        if prop.get("name") == "styleSheet":
+            prop.find("string").text += app.EXTRA_QSS
+            break
+    source = io.StringIO(ET.tostring(tree.getroot(), encoding="unicode"))
+    with open(UI_MODULE, "w", encoding="utf-8") as f:
+        uic.compileUi(source, f)
+    return UI_MODULE
+
+
+def render_svg(path, size):
+    reader = QImageReader(path)
+    native = reader.size()
+    if native.isValid():
+        size = native.scaled(size, Qt.AspectRatioMode.KeepAspectRatio)
+    reader.setScaledSize(size)
+    image = reader.read()
+    if image.isNull():
+        raise RuntimeError(f"cannot render {path}: {reader.errorString()}")
+    return image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+
+
+def render_white_icon(path, size, out):
+    """Same tint as EstudyoApp._white_icon, done once at the final pixel size."""
+    image = render_svg(path, QSize(size, size))
+    painter = QPainter(image)
+    painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceIn)
+    painter.fillRect(image.rect(), Qt.GlobalColor.white)
+    painter.end()
+    image.save(out)
+    return out
+
+
+def build():
+    os.makedirs(ICON_DIR, exist_ok=True)
+    manifest = {"sources": app.asset_sources(), "ui_module": compile_ui(), "styles_baked": True,
+                "logo": None, "icons": {}}
+
+    logo = app._first_existing(app.LOGO_PATHS)
+    if logo is not None:
+        out = os.path.join(ICON_DIR, f"estudyo_logo_{app.LOGO_SIZE}.png")
+        render_svg(logo, QSize(app.LOGO_SIZE, app.LOGO_SIZE)).save(out)
+        manifest["logo"] = out
+
+    for name, paths in app.NAV_ICON_PATHS.items():
+        path = app._first_existing(paths)
+        if path is None:
+            continue
+        base = os.path.splitext(os.path.basename(path))[0]
+        manifest["icons"][name] = {
+            str(app.NAV_ICON_SIZE * scale): render_white_icon(
+                path, app.NAV_ICON_SIZE * scale, os.path.join(ICON_DIR, f"{base}_white_{app.NAV_ICON_SIZE * scale}.png"))
+            for scale in ICON_SCALES
+        }
+
+    with open(app.ASSET_MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    qt = QGuiApplication(sys.argv)
+    result = build()
+    print(f"Wrote {app.ASSET_MANIFEST}: {result['ui_module']}, logo and {len(result['icons'])} icon set(s).")
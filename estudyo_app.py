@@ -1,14 +1,49 @@
 import sys
 import csv
 import os
+import re
+import json
+import atexit
+import argparse
+from array import array
+import hashlib
+import importlib.util
+import time
+import socketserver
+import gzip
+import heapq
+import io
+import itertools
+import bisect
+import multiprocessing
+import shutil
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
+try:
+    import zstandard
+except ImportError:  # zstd storage is optional
+    zstandard = None
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 from PyQt6 import QtWidgets, uic
 from PyQt6.QtWidgets import (
     QMessageBox, QTableWidgetItem, QHeaderView, QAbstractItemView,
     QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QLabel,
-    QLineEdit, QComboBox, QPushButton,  QDialogButtonBox, QGroupBox
+    QLineEdit, QComboBox, QPushButton,  QDialogButtonBox, QGroupBox, QInputDialog,
+    QProgressBar, QApplication, QTableWidget, QCompleter
+)
+from PyQt6.QtCore import Qt, QRegularExpression, QObject, pyqtSignal
+from PyQt6.QtGui import (
+    QPixmap, QIcon, QRegularExpressionValidator, QColor, QKeySequence, QShortcut,
+    QStandardItemModel, QStandardItem
 )
-from PyQt6.QtCore import Qt, QRegularExpression
-from PyQt6.QtGui import QPixmap, QIcon, QRegularExpressionValidator, QColor
 from PyQt6.QtCore import QSize
 from PyQt6.QtGui import QIcon, QPixmap, QPainter
 
@@ -16,175 +51,2329 @@ from PyQt6.QtGui import QIcon, QPixmap, QPainter
 COLLEGES_CSV = "colleges.csv"
 PROGRAMS_CSV = "programs.csv"
 STUDENTS_CSV = "students.csv"
+# Optional partitioned layout for students: one CSV per shard plus a manifest
+STUDENT_SHARD_DIR = "students"
+
+# Journal written while a multi-table commit swaps its files into place
+COMMIT_JOURNAL = ".estudyo-commit.json"
+# Append-only log of row changes, one JSON event per line (see ChangeFeed)
+CHANGE_LOG = "changes.jsonl"
+CHANGE_FEED_PORT = 8765
+# Full snapshots that bound how much of the change log a point-in-time read replays
+HISTORY_DIR = "history"
+CHECKPOINT_INTERVAL = 5000  # events between checkpoints
+# Deduplicated backups (see BackupStore) and how many of them rotation keeps
+BACKUP_DIR = "backups"
+BACKUP_KEEP_LAST = 7     # newest backups
+BACKUP_KEEP_DAILY = 14   # plus the newest backup of each of this many days
+BACKUP_KEEP_WEEKLY = 8   # and of each of this many weeks
 
 NULL_DISPLAY = "-NULL-"
 
+# Table name -> (csv path, field names, key field)
+TABLES = {
+    "colleges": (COLLEGES_CSV, ["code", "name"], "code"),
+    "programs": (PROGRAMS_CSV, ["code", "name", "college_code"], "code"),
+    "students": (STUDENTS_CSV, ["id", "first_name", "last_name", "gender", "program_code", "year_level"], "id"),
+}
+
+UNDO_LIMIT = 100
+
+# Compound queries (see parse_query): operator spellings and short field names
+QUERY_OPS = {"=": "=", "==": "=", "contains": "contains", "~": "contains"}
+QUERY_FIELD_ALIASES = {"program": "program_code", "year": "year_level", "first": "first_name",
+                       "last": "last_name"}
+_QUERY_CONDITION = re.compile(
+    r"\s*(?P<field>\w+)\s*(?P<op>==?|~|contains\b)\s*(?P<value>\"[^\"]*\"|'[^']*'|[^\s\"']+)\s*(?:\band\b\s*|$)",
+    re.IGNORECASE)
+
+# Extra student-view columns resolved through the program/college join cache
+JOINED_STUDENT_COLUMNS = [("program_name", "Program Name"), ("college_code", "College"),
+                          ("college_name", "College Name")]
+
+# Table -> text fields searched by the fuzzy (typo-tolerant) search
+FUZZY_FIELDS = {
+    "students": ("first_name", "last_name"),
+    "programs": ("name",),
+    "colleges": ("name",),
+}
+
+# Table files may be stored plain, gzip- or zstd-compressed; reads detect the format from
+# the first bytes. ESTUDYO_COMPRESSION forces the format of every write; when unset each
+# file keeps the format it already has.
+COMPRESSION_MAGIC = {"gzip": b"\x1f\x8b", "zstd": b"\x28\xb5\x2f\xfd"}
+COMPRESSION_FORMATS = ("plain", "gzip", "zstd")
+STORAGE_COMPRESSION = os.environ.get("ESTUDYO_COMPRESSION") or None
+
+# Memory budget of the search/sort result cache (see ResultCache)
+RESULT_CACHE_BYTES = int(os.environ.get("ESTUDYO_RESULT_CACHE_KB", "8192")) * 1024
+
+# Plain table files at least this large are parsed in chunks by a process pool
+PARALLEL_PARSE_MIN_BYTES = int(os.environ.get("ESTUDYO_PARALLEL_PARSE_MIN_BYTES", str(16 * 1024 * 1024)))
+PARSE_WORKERS = int(os.environ.get("ESTUDYO_PARSE_WORKERS", "0")) or os.cpu_count() or 1
+
+# Write-back defaults for the GUI. An interval of 0 writes every commit straight through.
+FLUSH_INTERVAL_MS = int(os.environ.get("ESTUDYO_FLUSH_INTERVAL_MS", "2000"))
+FLUSH_MAX_OPS = int(os.environ.get("ESTUDYO_FLUSH_MAX_OPS", "50"))
+
+
+def _diff_rows(key, before, after):
+    """Row-level diff of two versions of a table, matched on key.
+    Rows sharing a key are paired in order, so dropping one of two duplicates is a delete.
+    Returns a list of (key, old_pos, old_row, new_pos, new_row); a missing side is None."""
+    old_by_key = {}
+    duplicates = {}  # key -> later (pos, row) of keys seen more than once
+    for i, r in enumerate(before):
+        k = r[key]
+        if k in old_by_key:
+            duplicates.setdefault(k, []).append((i, r))
+        else:
+            old_by_key[k] = (i, r)
+    diff = []
+    for i, r in enumerate(after):
+        k = r[key]
+        old = old_by_key.pop(k, None)
+        if old is None and duplicates.get(k):
+            old = duplicates[k].pop(0)
+        if old is None:
+            diff.append((k, None, None, i, r))
+        elif old[1] != r:
+            diff.append((k, old[0], old[1], i, r))
+    for k, (i, r) in old_by_key.items():
+        diff.append((k, i, r, None, None))
+    for k, rest in duplicates.items():
+        diff.extend((k, i, r, None, None) for i, r in rest)
+    return diff
+
+
+def _apply_diff(key, rows, diff, inverse=False):
+    """Apply a diff from _diff_rows to rows (or undo it when inverse) and return the new rows."""
+    removed, replaced, inserted = [], {}, []
+    for k, old_pos, old, new_pos, new in diff:
+        src, dst = (new, old) if inverse else (old, new)
+        src_pos, pos = (new_pos, old_pos) if inverse else (old_pos, new_pos)
+        if src is not None and dst is not None and src[key] == dst[key]:
+            replaced.setdefault(src[key], []).append(dst)
+            continue
+        if src is not None:
+            removed.append((src_pos, src))
+        if dst is not None:
+            inserted.append((pos, dst))
+    # A removed row is looked for at its recorded position, then anywhere with equal
+    # data, then by key alone (another program may have changed it since)
+    dropped, by_key = set(), None
+    for pos, src in removed:
+        if pos is None or pos >= len(rows) or pos in dropped or rows[pos] != src:
+            if by_key is None:
+                by_key = {}
+                for i, r in enumerate(rows):
+                    by_key.setdefault(r[key], []).append(i)
+            candidates = [i for i in by_key.get(src[key], ()) if i not in dropped]
+            pos = next((i for i in candidates if rows[i] == src), candidates[0] if candidates else None)
+        if pos is not None:
+            dropped.add(pos)
+    result = []
+    for i, r in enumerate(rows):
+        if i in dropped:
+            continue
+        later = replaced.get(r[key])
+        result.append(later.pop(0) if later else r)
+    for pos, row in sorted(inserted, key=lambda item: item[0]):
+        result.insert(min(pos, len(result)), row)
+    return result
+
+
+@contextmanager
+def _file_lock(path):
+    """Hold an exclusive lock on path (created if missing), shared by all processes."""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _check_compression(compression):
+    if compression not in (None,) + COMPRESSION_FORMATS:
+        raise ValueError(f"Unknown compression '{compression}', expected one of {', '.join(COMPRESSION_FORMATS)}.")
+    if compression == "zstd" and zstandard is None:
+        raise ValueError("zstd compression needs the 'zstandard' package.")
+    return compression
+
+
+def _detect_compression(path):
+    """Format of the file at path from its magic bytes; "plain" if missing or uncompressed."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(4)
+    except FileNotFoundError:
+        return "plain"
+    for name, magic in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return name
+    return "plain"
+
+
+def _open_text(path, mode, compression="plain"):
+    """Open a table file as a text stream, compressing or decompressing on the fly.
+
+    mode is "r" or "w"; reads detect the format and ignore compression."""
+    if mode == "r":
+        compression = _detect_compression(path)
+    if compression == "gzip":
+        return gzip.open(path, mode + "t", compresslevel=6, encoding="utf-8", newline="")
+    if compression == "zstd":
+        _check_compression("zstd")
+        raw = open(path, mode + "b")
+        if mode == "r":
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def _record_end(data, begin, pos):
+    """Offset just past the first CSV record of data that ends at or after pos, where
+    begin is the start of a record.
+
+    A newline ends a record only outside quotes, and it is outside quotes exactly when an
+    even number of quote characters lie between it and begin (an escaped quote is written
+    twice), so this moves to the first newline with an even quote count before it."""
+    quotes = data.count(b'"', begin, pos)
+    nl = data.find(b"\n", pos)
+    while nl != -1:
+        quotes += data.count(b'"', pos, nl)
+        if quotes % 2 == 0:
+            return nl + 1
+        pos = nl + 1
+        nl = data.find(b"\n", pos)
+    return len(data)
+
+
+def _parse_csv_chunk(chunk, fieldnames):
+    """Parse bytes holding whole CSV records the way csv.DictReader does."""
+    text = chunk.decode("utf-8")
+    rows = []
+    width = len(fieldnames)
+    # One string object per distinct value: genders, codes and year levels repeat on every
+    # row, and pickle sends a repeated object only once, so results travel back far faster
+    seen = {}
+    for values in csv.reader(io.StringIO(text, newline="")):
+        if not values:
+            continue
+        values = [seen.setdefault(v, v) for v in values]
+        row = dict(zip(fieldnames, values))
+        if len(values) > width:
+            row[None] = values[width:]
+        elif len(values) < width:
+            for name in fieldnames[len(values):]:
+                row[name] = None
+        rows.append(row)
+    return rows
+
+
+# (workers, ProcessPoolExecutor) kept between loads, created on first use
+_parse_pool = None
+
+
+def parse_csv_parallel(path, workers=None):
+    """Rows of a plain CSV file as dicts, parsed in record-aligned chunks by a pool of
+    worker processes. Same result as list(csv.DictReader(f)), including quoted fields
+    with embedded newlines. Workers get the bytes of their chunk, not offsets into the
+    file, so a concurrent save cannot mix two versions of it."""
+    global _parse_pool
+    workers = workers or PARSE_WORKERS
+    with open(path, "rb") as f:
+        data = f.read()
+    header = _record_end(data, 0, 0)
+    fieldnames = next(csv.reader(io.StringIO(data[:header].decode("utf-8"), newline="")), None)
+    if fieldnames is None:
+        return []
+    if workers <= 1:
+        return _parse_csv_chunk(data[header:], fieldnames)
+    # Several chunks per worker keeps them all busy when some chunks parse slower
+    step = max(1, (len(data) - header) // (workers * 4))
+    cuts = [header]
+    while cuts[-1] < len(data):
+        cuts.append(_record_end(data, cuts[-1], min(len(data), cuts[-1] + step)))
+    if _parse_pool is None or _parse_pool[0] != workers:
+        if _parse_pool is not None:
+            _parse_pool[1].shutdown()
+        # Spawned, not forked: forking a process that runs Qt and I/O threads can
+        # deadlock the child on a lock one of those threads held
+        _parse_pool = (workers, ProcessPoolExecutor(max_workers=workers,
+                                                    mp_context=multiprocessing.get_context("spawn")))
+    chunks = (data[a:b] for a, b in zip(cuts, cuts[1:]))
+    rows = []
+    for part in _parse_pool[1].map(_parse_csv_chunk, chunks, [fieldnames] * (len(cuts) - 1)):
+        rows.extend(part)
+    return rows
+
+
+def read_csv_file(path):
+    """Rows of a table file as dicts, [] if it does not exist. Compressed files are
+    detected, and large plain ones are parsed in parallel (see parse_csv_parallel)."""
+    if not os.path.exists(path):
+        return []
+    if (PARSE_WORKERS > 1 and os.path.getsize(path) >= PARALLEL_PARSE_MIN_BYTES
+            and _detect_compression(path) == "plain"):
+        return parse_csv_parallel(path)
+    with _open_text(path, "r") as f:
+        return list(csv.DictReader(f))
+
+
+def write_csv_file(path, fieldnames, rows, compression=None):
+    """Write rows to a table file in the given format; None keeps the file's current one."""
+    if compression is None:
+        # A temp file takes the format of the file it is about to replace
+        target = path[:-len(".tmp")] if path.endswith(".tmp") else path
+        compression = _detect_compression(target)
+    with _open_text(path, "w", compression) as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+class ShardedTable:
+    """Student rows stored as one CSV per shard, listed in manifest.json.
+
+    Shards are keyed by enrolment year (the XXXX prefix of the id) or by program code.
+    Each shard is parsed only when it is first read or changed on disk, writes rewrite
+    only the shards a commit touched, and with year partitioning an id search reads only
+    the shards whose year can match."""
+    MANIFEST = "manifest.json"
+
+    def __init__(self, manager, directory, partition, shards):
+        self.manager = manager
+        self.directory = directory
+        self.partition = partition
+        self.shards = shards      # shard key -> {"file": name, "rows": count}
+        self._cache = {}          # shard key -> (stamp, rows)
+
+    @classmethod
+    def open(cls, manager, directory=STUDENT_SHARD_DIR):
+        """Return the sharded table in directory, or None if the layout is not in use."""
+        try:
+            with open(os.path.join(directory, cls.MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        return cls(manager, directory, manifest["partition"], manifest["shards"])
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.directory, self.MANIFEST)
+
+    def stamp(self):
+        return CSVManager._file_stamp(self.manifest_path)
+
+    def shard_of(self, row):
+        if self.partition == "program":
+            code = row.get("program_code") or ""
+            return NULL_DISPLAY if _is_null(code) else code
+        sid = row.get("id") or ""
+        return sid[:4] if _validate_student_id_format(sid) else "other"
+
+    def _file_name(self, key):
+        return re.sub(r"[^A-Za-z0-9]+", "_", key).strip("_").lower() or "null"
+
+    def read_shard(self, key):
+        path = os.path.join(self.directory, self.shards[key]["file"])
+        stamp = CSVManager._file_stamp(path)
+        cached = self._cache.get(key)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, self.manager._read_csv(path))
+            self._cache[key] = cached
+        return cached[1]
+
+    def iter_rows(self, keys=None):
+        """Yield rows shard by shard, parsing each shard only when it is reached."""
+        for key in sorted(self.shards if keys is None else keys):
+            yield from self.read_shard(key)
+
+    def read_all(self):
+        return list(self.iter_rows())
+
+    def keys_for_id_query(self, value):
+        """Shards that can hold an id containing value. Ids are "YYYY-NNNN", so a "-" in
+        the query pins where it sits in the id and therefore which year digits it covers."""
+        if self.partition != "year" or "-" not in value:
+            return list(self.shards)
+        head = value.split("-", 1)[0]
+        if len(head) > 4:
+            return []
+        return [k for k in self.shards if k != "other" and k.endswith(head)] + (["other"] if "other" in self.shards else [])
+
+    def keys_touched(self, diff):
+        keys = set()
+        for _, _, old, _, new in diff:
+            for row in (old, new):
+                if row is not None:
+                    keys.add(self.shard_of(row))
+        return keys
+
+    def prepare_write(self, rows, dirty):
+        """Write temp files for the dirty shards and the manifest; return the (tmp, path) moves."""
+        fieldnames = TABLES["students"][1]
+        groups = {key: [] for key in dirty}
+        for r in rows:
+            key = self.shard_of(r)
+            if key in groups:
+                groups[key].append(r)
+        shards = dict(self.shards)
+        used = {info["file"] for info in shards.values()}
+        moves = []
+        for key, shard_rows in groups.items():
+            info = shards.get(key)
+            if info is None:
+                name = self._file_name(key) + ".csv"
+                while name in used:
+                    name = "_" + name
+                used.add(name)
+                info = {"file": name}
+            shards[key] = {"file": info["file"], "rows": len(shard_rows)}
+            path = os.path.join(self.directory, info["file"])
+            self.manager._write_csv(path + ".tmp", fieldnames, shard_rows)
+            moves.append((path + ".tmp", path))
+        self.shards = shards
+        self._write_manifest(self.manifest_path + ".tmp")
+        moves.append((self.manifest_path + ".tmp", self.manifest_path))
+        return moves
+
+    def _write_manifest(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"partition": self.partition, "shards": self.shards}, f, indent=1)
+
+    @classmethod
+    def create(cls, manager, rows, partition, directory=STUDENT_SHARD_DIR):
+        """Split rows into a new sharded layout in directory."""
+        os.makedirs(directory, exist_ok=True)
+        table = cls(manager, directory, partition, {})
+        keys = {table.shard_of(r) for r in rows}
+        for tmp, path in table.prepare_write(rows, keys):
+            os.replace(tmp, path)
+        return table
+
+
+class Transaction:
+    """Unit of work: table rewrites are staged in memory and written together on commit.
+
+    A table is staged either whole (read, then rewritten as a list) or as single-row
+    edits against its committed rows, which commit without copying or diffing the rest."""
+    def __init__(self, label, record, check=True):
+        self.label = label
+        self.record = record
+        self.check = check  # validate keys and references on commit
+        self.owner = threading.get_ident()
+        self.base = {}     # table -> committed rows when first used (shared, never modified)
+        self.staged = {}   # table -> rows to write on commit
+        self.edits = {}    # table -> {committed key: new row, or None to delete it}
+        self.added = {}    # table -> rows to append
+        self.current = {}  # table -> {key: row} of the edited and added rows, by their new key
+
+
+class BackupStore:
+    """Incremental, deduplicated backups of the data files.
+
+    Files are cut into content-defined chunks: a chunk ends after a line whose CRC-32 has
+    its low bits all zero, so an edit only changes the chunks around it and the rest are
+    found again by content. Chunks are stored once, gzipped, under their SHA-256 in
+    chunks/; each backup point is a small JSON manifest in points/ listing every file's
+    chunks. A file whose (mtime, size) matches the previous point is not even read.
+    Backups, rotation and rebuilds hold a lock on the directory, so rotation never
+    deletes a chunk that a backup found already stored and is counting on."""
+    CHUNK_MASK = 0x3FF        # about one cut per 1024 lines
+    MIN_CHUNK = 8 * 1024
+    MAX_CHUNK = 256 * 1024
+
+    def __init__(self, directory=BACKUP_DIR):
+        self.directory = directory
+        self.chunk_dir = os.path.join(directory, "chunks")
+        self.point_dir = os.path.join(directory, "points")
+        self.lock_path = os.path.join(directory, ".lock")
+        self._thread_lock = threading.RLock()
+        self._lock_depth = 0
+
+    @contextmanager
+    def lock(self):
+        """Exclusive lock on the backup directory across processes. Nested calls on one
+        thread share the outermost one."""
+        with self._thread_lock:
+            self._lock_depth += 1
+            try:
+                if self._lock_depth > 1:
+                    yield
+                    return
+                os.makedirs(self.directory, exist_ok=True)
+                with _file_lock(self.lock_path):
+                    yield
+            finally:
+                self._lock_depth -= 1
+
+    def points(self):
+        """Backup manifests, oldest first."""
+        if not os.path.isdir(self.point_dir):
+            return []
+        points = []
+        for name in sorted(os.listdir(self.point_dir)):
+            if name.endswith(".json"):
+                with open(os.path.join(self.point_dir, name), encoding="utf-8") as f:
+                    points.append(json.load(f))
+        return sorted(points, key=lambda p: p["ts"])
+
+    def point(self, point_id):
+        try:
+            with open(os.path.join(self.point_dir, point_id + ".json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ValueError(f"No backup '{point_id}'.") from None
+
+    def unchanged(self, rel, stamp, latest):
+        """Whether rel still has the stamp it had in the latest point."""
+        entry = latest["files"].get(rel) if latest else None
+        return stamp is not None and entry is not None and entry["stamp"] == list(stamp)
+
+    def _cuts(self, data):
+        view = memoryview(data)
+        start = pos = 0
+        while pos < len(data):
+            nl = data.find(b"\n", pos)
+            end = len(data) if nl == -1 else nl + 1
+            size = end - start
+            if (size >= self.MAX_CHUNK or end == len(data) or
+                    (size >= self.MIN_CHUNK and zlib.crc32(view[pos:end]) & self.CHUNK_MASK == 0)):
+                yield start, end
+                start = end
+            pos = end
+
+    def _chunk_path(self, digest):
+        return os.path.join(self.chunk_dir, digest[:2], digest)
+
+    def backup(self, files, label=None):
+        """Store a backup point. files maps a relative path to (stamp, bytes); bytes None
+        means the file is unchanged since the latest point. Returns the new manifest."""
+        with self.lock():
+            started = time.perf_counter()
+            points = self.points()
+            latest = points[-1] if points else None
+            stats = {"files": len(files), "unchanged_files": 0, "chunks": 0, "new_chunks": 0, "new_bytes": 0}
+            entries = {}
+            for rel, (stamp, data) in files.items():
+                if data is None:
+                    entries[rel] = latest["files"][rel]
+                    stats["unchanged_files"] += 1
+                    stats["chunks"] += len(entries[rel]["chunks"])
+                    continue
+                chunks = []
+                for a, b in self._cuts(data):
+                    digest = hashlib.sha256(data[a:b]).hexdigest()
+                    chunks.append(digest)
+                    path = self._chunk_path(digest)
+                    if not os.path.exists(path):
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        packed = gzip.compress(data[a:b], compresslevel=6, mtime=0)
+                        with open(path + ".tmp", "wb") as f:
+                            f.write(packed)
+                        os.replace(path + ".tmp", path)
+                        stats["new_chunks"] += 1
+                        stats["new_bytes"] += len(packed)
+                stats["chunks"] += len(chunks)
+                entries[rel] = {"stamp": list(stamp), "size": len(data),
+                                "sha256": hashlib.sha256(data).hexdigest(), "chunks": chunks}
+            now = time.time()
+            point_id = datetime.fromtimestamp(now).strftime("%Y%m%d-%H%M%S")
+            while os.path.exists(os.path.join(self.point_dir, point_id + ".json")):
+                point_id += "_"
+            stats["seconds"] = round(time.perf_counter() - started, 3)
+            manifest = {"id": point_id, "ts": now, "label": label, "files": entries, "stats": stats}
+            os.makedirs(self.point_dir, exist_ok=True)
+            path = os.path.join(self.point_dir, point_id + ".json")
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+            os.replace(path + ".tmp", path)
+            return manifest
+
+    def rebuild(self, point_id, out_dir):
+        """Write the files of a backup point under out_dir; returns their relative paths."""
+        with self.lock():
+            point = self.point(point_id)
+            for rel, entry in point["files"].items():
+                target = os.path.join(out_dir, rel)
+                os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+                digest = hashlib.sha256()
+                with open(target, "wb") as out:
+                    for chunk in entry["chunks"]:
+                        with open(self._chunk_path(chunk), "rb") as f:
+                            data = gzip.decompress(f.read())
+                        digest.update(data)
+                        out.write(data)
+                if digest.hexdigest() != entry["sha256"]:
+                    raise ValueError(f"Backup {point_id} is damaged: {rel} does not match its checksum.")
+            return list(point["files"])
+
+    def rotate(self, keep_last=BACKUP_KEEP_LAST, keep_daily=BACKUP_KEEP_DAILY, keep_weekly=BACKUP_KEEP_WEEKLY):
+        """Delete the points the policy does not keep, then the chunks no point uses.
+        Returns the ids of the deleted points."""
+        with self.lock():
+            newest_first = self.points()[::-1]
+            keep = {p["id"] for p in newest_first[:keep_last]}
+            for period, count in (("%Y-%m-%d", keep_daily), ("%G-W%V", keep_weekly)):
+                seen = set()
+                for p in newest_first:
+                    when = datetime.fromtimestamp(p["ts"]).strftime(period)
+                    if when not in seen and len(seen) < count:
+                        seen.add(when)
+                        keep.add(p["id"])
+            removed = [p["id"] for p in newest_first if p["id"] not in keep]
+            for point_id in removed:
+                os.remove(os.path.join(self.point_dir, point_id + ".json"))
+            if removed:
+                used = {c for p in newest_first if p["id"] in keep for e in p["files"].values() for c in e["chunks"]}
+                for root, _, names in os.walk(self.chunk_dir):
+                    for name in names:
+                        if name not in used:
+                            os.remove(os.path.join(root, name))
+            return removed
+
+
+class IntegrityIssue:
+    """One problem found by CSVManager.check_integrity.
+
+    fix is the value that repair_integrity writes into field, DROP_ROW to delete the
+    row, or None when the problem needs a person to resolve it."""
+    DROP_ROW = object()
+
+    def __init__(self, table, row, key, problem, field=None, fix=None):
+        self.table = table
+        self.row = row  # index of the row in its table
+        self.key = key
+        self.problem = problem
+        self.field = field
+        self.fix = fix
+
+    @property
+    def fixable(self):
+        return self.fix is not None
+
+    def describe_fix(self):
+        if self.fix is None:
+            return "Manual"
+        if self.fix is IntegrityIssue.DROP_ROW:
+            return "Remove row"
+        return f"Set {self.field} to {self.fix}"
+
+
+class ChangeFeed:
+    """Append-only log of every committed row change, numbered with a monotonic seq.
+
+    Each line is a JSON event: seq, ts, txn (seq of the first event of its commit),
+    label, table, op (insert/update/delete), key, before and after. A change of key is
+    logged as a delete of the old key and an insert of the new one. Seqs are given out
+    on append, after the last one in the file and under a lock on it, so processes
+    sharing a data directory still write one gapless sequence. Because seq only grows,
+    since(seq) finds its starting point with a binary search over byte offsets, so
+    reading recent changes costs O(changes) no matter how long the log is."""
+    def __init__(self, path=CHANGE_LOG):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.last_seq = self.read_last_seq()
+
+    def read_last_seq(self):
+        """Seq of the last complete event in the log, 0 if there is none."""
+        try:
+            with open(self.path, "rb") as f:
+                return self._tail(f)[0]
+        except FileNotFoundError:
+            return 0
+
+    @classmethod
+    def _tail(cls, f):
+        """(seq of the last complete event, offset just past its line), or (0, 0). A line
+        cut short by a crash in the middle of an append does not count."""
+        f.seek(0, os.SEEK_END)
+        pos, block = f.tell(), b""
+        while pos > 0:
+            step = min(65536, pos)
+            pos -= step
+            f.seek(pos)
+            block = f.read(step) + block
+            cut = block.rfind(b"\n")
+            while cut != -1:
+                start = block.rfind(b"\n", 0, cut) + 1
+                if start == 0 and pos > 0:
+                    break  # the line may begin before this block
+                event = cls._parse(block[start:cut])
+                if event is not None:
+                    return event["seq"], pos + cut + 1
+                cut = start - 1
+            block = block[:cut + 1]
+        return 0, 0
+
+    @staticmethod
+    def _parse(line):
+        """The event on a log line, or None for a torn or empty line."""
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return None
+        return event if isinstance(event, dict) and "seq" in event else None
+
+    def make_events(self, label, changes):
+        """The row diffs of one commit (see _diff_rows) as events; append() numbers them."""
+        events = []
+        ts = time.time()
+        for name, diff in changes.items():
+            for key, _, old, _, new in diff:
+                op = "insert" if old is None else "delete" if new is None else "update"
+                events.append({"seq": None, "ts": ts, "txn": None, "label": label,
+                               "table": name, "op": op, "key": key, "before": old, "after": new})
+        return events
+
+    @contextmanager
+    def lock(self):
+        """Exclusive lock on the log across processes; append() must be called under it."""
+        with _file_lock(self.lock_path):
+            yield
+
+    def append(self, commits):
+        """Number the events of commits (lists from make_events, oldest first) from the
+        last seq in the file on, and write them. A torn last line is cut off first."""
+        commits = [events for events in commits if events]
+        if not commits:
+            return
+        with open(self.path, "a+b") as f:
+            seq, end = self._tail(f)
+            if f.seek(0, os.SEEK_END) > end:
+                f.truncate(end)
+            lines = []
+            for events in commits:
+                txn = seq + 1
+                for event in events:
+                    seq += 1
+                    event["seq"], event["txn"] = seq, txn
+                    lines.append(json.dumps(event, separators=(",", ":")) + "\n")
+            f.write("".join(lines).encode("utf-8"))
+        self.last_seq = seq
+
+    def since(self, seq, limit=None):
+        """Events with a seq greater than seq, oldest first."""
+        return list(itertools.islice(self.iter_since(seq), limit))
+
+    def iter_since(self, seq):
+        """Like since, but read lazily: the log is only read as far as the caller iterates."""
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            offset = self._offset_after(f, seq)
+            f.seek(offset)
+            if offset:
+                f.readline()  # partial line, older than seq
+            for line in f:
+                event = self._parse(line)
+                if event is None:
+                    return  # an append in progress
+                if event["seq"] > seq:
+                    yield event
+
+    @staticmethod
+    def _offset_after(f, seq):
+        """Byte offset inside or before the line of the last event with a seq of at most seq."""
+        f.seek(0, os.SEEK_END)
+        lo, hi = 0, f.tell()
+        while hi - lo > 4096:
+            mid = (lo + hi) // 2
+            f.seek(mid)
+            f.readline()  # skip to the next line boundary
+            event = ChangeFeed._parse(f.readline())
+            if event is None or event["seq"] > seq:
+                hi = mid
+            else:
+                lo = mid
+        return lo
+
+
+class History:
+    """Point-in-time versions of the three tables.
+
+    The change log already holds every commit as a row-level delta; History adds a
+    gzipped checkpoint of all tables every CHECKPOINT_INTERVAL events. A version is
+    rebuilt from the newest checkpoint at or before it plus the events after that
+    checkpoint, so no read replays more than one interval of the log."""
+    def __init__(self, feed, directory=HISTORY_DIR, interval=CHECKPOINT_INTERVAL):
+        self.feed = feed
+        self.directory = directory
+        self.interval = interval
+        self._index_path = os.path.join(directory, "checkpoints.json")
+        self._checkpoints = self._read_index()  # [{"seq", "ts", "file"}], oldest first
+
+    def _read_index(self):
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def checkpoints(self):
+        """The checkpoints on disk, oldest first (another process may have added some)."""
+        self._checkpoints = self._read_index()
+        return list(self._checkpoints)
+
+    def maybe_checkpoint(self, seq, load_tables):
+        """Write a checkpoint at seq if none exists yet or the last one is interval events old."""
+        checkpoints = self.checkpoints()
+        if checkpoints and seq - checkpoints[-1]["seq"] < self.interval:
+            return None
+        return self.checkpoint(seq, load_tables())
+
+    def checkpoint(self, seq, tables, ts=None):
+        """Store tables as the version at seq, current since ts (default now)."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"checkpoint-{seq:012d}.json.gz")
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(tables, f, separators=(",", ":"))
+        entry = {"seq": seq, "ts": time.time() if ts is None else ts, "file": os.path.basename(path)}
+        self._checkpoints = self._read_index()
+        self._checkpoints.append(entry)
+        tmp = self._index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._checkpoints, f, indent=1)
+        os.replace(tmp, self._index_path)
+        return entry
+
+    def _base_for(self, seq=None, ts=None):
+        """Newest checkpoint at or before seq/ts."""
+        base = None
+        checkpoints = self.checkpoints()
+        for cp in checkpoints:
+            if (seq is not None and cp["seq"] > seq) or (ts is not None and cp["ts"] > ts):
+                break
+            base = cp
+        if base is None:
+            first = checkpoints[0] if checkpoints else None
+            when = f"seq {first['seq']}" if first else "the first checkpoint"
+            raise ValueError(f"No history recorded before {when}.")
+        return base
+
+    def at(self, seq=None, ts=None):
+        """Rebuild every table as of seq, or as of UNIX time ts. Returns table -> rows."""
+        base = self._base_for(seq, ts)
+        with gzip.open(os.path.join(self.directory, base["file"]), "rt", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        # key -> rows with that key (more than one only for duplicate keys)
+        tables = {name: {} for name in snapshot}
+        for name, rows in snapshot.items():
+            for r in rows:
+                tables[name].setdefault(r[TABLES[name][2]], []).append(r)
+        for event in self.feed.iter_since(base["seq"]):
+            if (seq is not None and event["seq"] > seq) or (ts is not None and event["ts"] > ts):
+                break
+            rows = tables[event["table"]].setdefault(event["key"], [])
+            if event["before"] in rows:
+                rows.remove(event["before"])
+            elif event["before"] is not None and rows:
+                rows.pop(0)
+            if event["after"] is not None:
+                rows.append(event["after"])
+        return {name: [r for rows in by_key.values() for r in rows] for name, by_key in tables.items()}
+
+    def diff(self, from_seq, to_seq):
+        """Net row changes between two versions, table -> [(key, before, after)].
+        Only the events in between are read; neither version is rebuilt."""
+        net = {}
+        for event in self.feed.iter_since(from_seq):
+            if event["seq"] > to_seq:
+                break
+            k = (event["table"], event["key"])
+            before = net[k][0] if k in net else event["before"]
+            net[k] = (before, event["after"])
+        result = {}
+        for (name, key), (before, after) in net.items():
+            if before != after:
+                result.setdefault(name, []).append((key, before, after))
+        return result
+
+
+def _edit_distance(a, b, limit):
+    """Optimal-string-alignment distance between a and b (a transposition counts as one
+    edit), or limit + 1 as soon as it is known to exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = ca != cb
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def _trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyIndex:
+    """Typo-tolerant word lookup over some text fields of a table.
+
+    Rows are indexed by the distinct lower-cased words of the fields, and words by their
+    trigrams. A query word is only compared with the words sharing enough trigrams with
+    it to lie within the allowed edit distance, so the cost grows with the number of
+    distinct words, not rows."""
+
+    def __init__(self, rows, key, fields):
+        self.key = key
+        self.rows = {}
+        self._words = {}  # word -> keys of rows containing it
+        self._grams = {}  # trigram -> words containing it
+        for row in rows:
+            k = row[key]
+            self.rows[k] = row
+            for field in fields:
+                for word in re.findall(r"\w+", (row.get(field) or "").lower()):
+                    self._words.setdefault(word, set()).add(k)
+        for word in self._words:
+            for gram in _trigrams(word):
+                self._grams.setdefault(gram, []).append(word)
+
+    @staticmethod
+    def max_distance(word):
+        return 0 if len(word) < 3 else 1 if len(word) < 6 else 2
+
+    def match_word(self, query):
+        """word -> distance for indexed words within reach of query. A word that starts
+        with the query matches too, scored just behind an exact hit."""
+        limit = self.max_distance(query)
+        grams = _trigrams(query)
+        # An edit removes at most three of the query's trigrams, a transposition four
+        needed = len(grams) - 4 * limit
+        shared = {}
+        for gram in grams:
+            for word in self._grams.get(gram, ()):
+                shared[word] = shared.get(word, 0) + 1
+        candidates = shared if needed > 0 else self._words
+        found = {}
+        for word in candidates:
+            if needed > 0 and shared[word] < needed and not word.startswith(query):
+                continue
+            if word.startswith(query):
+                found[word] = 0 if word == query else 0.5
+                continue
+            distance = _edit_distance(query, word, limit)
+            if distance <= limit:
+                found[word] = distance
+        return found
+
+    def search(self, query, limit=200):
+        """Rows matching every word of query, best first, as (score, row).
+        A row's score is the sum of the distances of its closest word to each query word."""
+        scores = None
+        for qword in re.findall(r"\w+", query.lower()):
+            best = {}
+            for word, distance in self.match_word(qword).items():
+                for k in self._words[word]:
+                    if distance < best.get(k, float("inf")):
+                        best[k] = distance
+            if scores is None:
+                scores = best
+            else:
+                scores = {k: scores[k] + d for k, d in best.items() if k in scores}
+            if not scores:
+                return []
+        ranked = heapq.nsmallest(limit, ((score, k) for k, score in (scores or {}).items()))
+        return [(score, self.rows[k]) for score, k in ranked]
+
+
+class QueryIndex:
+    """Column indexes over one version of a table, each built the first time a query
+    needs it: equality maps every distinct lower-cased value of a column to the positions
+    of its rows (the column dictionary-encoded), substring search maps every trigram of a
+    column to the positions of the rows containing it."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self._eq = {}     # field -> {value: positions}
+        self._grams = {}  # field -> {trigram: positions}
+        self._lock = threading.Lock()
+
+    def eq_index(self, field):
+        with self._lock:
+            if field not in self._eq:
+                index = {}
+                for pos, row in enumerate(self.rows):
+                    index.setdefault((row.get(field) or "").lower(), set()).add(pos)
+                self._eq[field] = index
+            return self._eq[field]
+
+    def gram_index(self, field):
+        with self._lock:
+            if field not in self._grams:
+                index = {}
+                for pos, row in enumerate(self.rows):
+                    value = (row.get(field) or "").lower()
+                    for i in range(len(value) - 2):
+                        index.setdefault(value[i:i + 3], set()).add(pos)
+                self._grams[field] = index
+            return self._grams[field]
+
+    def plan(self, conditions):
+        """Conditions paired with the candidate positions from their index, most selective
+        first. Substring conditions shorter than a trigram have no index (positions None)
+        and come last, as filters over what the others left."""
+        planned = []
+        for field, op, value in conditions:
+            value = value.lower()
+            if op == "=":
+                planned.append((0, field, op, value, self.eq_index(field).get(value, set())))
+            elif len(value) >= 3:
+                index = self.gram_index(field)
+                postings = sorted((index.get(value[i:i + 3], set()) for i in range(len(value) - 2)), key=len)
+                planned.append((1, field, op, value, postings))
+            else:
+                planned.append((2, field, op, value, None))
+        size = lambda p: len(p[4]) if p[0] == 0 else len(p[4][0]) if p[0] == 1 else len(self.rows)
+        return sorted(planned, key=lambda p: (size(p), p[0]))
+
+    def run(self, conditions):
+        """Positions of the rows matching every condition, ascending."""
+        candidates = None
+        for kind, field, op, value, postings in self.plan(conditions):
+            if kind == 0:
+                candidates = postings if candidates is None else candidates & postings
+            elif kind == 1:
+                for p in postings:
+                    candidates = p if candidates is None else candidates & p
+                    if not candidates:
+                        break
+                # Sharing every trigram does not make it a substring; check the survivors
+                candidates = {i for i in candidates if value in (self.rows[i].get(field) or "").lower()}
+            else:
+                pool = range(len(self.rows)) if candidates is None else candidates
+                candidates = {i for i in pool if value in (self.rows[i].get(field) or "").lower()}
+            if not candidates:
+                return []
+        return sorted(candidates if candidates is not None else range(len(self.rows)))
+
+
+def parse_query(text, table="students"):
+    """Parse 'field op value AND field op value ...' into (field, op, value) conditions.
+
+    op is "=" or "contains" (also written "==" and "~"). Values with spaces go in single
+    or double quotes. Fields are the table's column names or a QUERY_FIELD_ALIASES name."""
+    conditions = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        m = _QUERY_CONDITION.match(text, pos)
+        if m is None:
+            raise ValueError(f"Cannot read the filter at: {text[pos:]!r}\n"
+                             "Expected e.g.: program = BSCS AND year = 3 AND last_name contains ab")
+        field = m.group("field").lower()
+        field = QUERY_FIELD_ALIASES.get(field, field)
+        if field not in TABLES[table][1]:
+            raise ValueError(f"Unknown field '{m.group('field')}'. Use one of: {', '.join(TABLES[table][1])}.")
+        op = QUERY_OPS[m.group("op").lower()]
+        value = m.group("value")
+        if value[:1] in "\"'" and len(value) > 1 and value[-1] == value[0]:
+            value = value[1:-1]
+        conditions.append((field, op, value))
+        pos = m.end()
+    return conditions
+
+
+class ResultCache:
+    """Least-recently-used cache of search and sort results.
+
+    Entries are keyed by (table, filters, sort) and hold the positions of the result rows
+    in one version of the table as a compact int array (whose getsizeof is its real
+    footprint), so a hit only has to copy those rows out. Entries made for an older
+    table version are dropped as soon as a newer one is published (see discard_stale),
+    or on lookup. Least recently used entries are evicted once the entries, keys
+    included, together take more than max_bytes."""
+
+    def __init__(self, max_bytes=RESULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (version, positions, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.stale = self.evictions = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._drop(key)
+                self.stale += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, version, positions):
+        size = sys.getsizeof(positions) + self._key_size(key)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (version, positions, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    @classmethod
+    def _key_size(cls, key):
+        """Footprint of a key, counting the tuples and strings nested in it."""
+        size = sys.getsizeof(key)
+        if isinstance(key, tuple):
+            size += sum(cls._key_size(item) for item in key)
+        return size
+
+    def _drop(self, key):
+        self._bytes -= self._entries.pop(key)[2]
+
+    def discard_stale(self, versions):
+        """Drop the entries of every table whose version is no longer versions[table]."""
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry[0] != versions.get(k[0], entry[0])]:
+                self._drop(key)
+                self.stale += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "stale": self.stale,
+                    "evictions": self.evictions, "entries": len(self._entries),
+                    "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+class JoinCache:
+    """Program code -> (program name, college code, college name) for the student view.
+
+    Built once from the programs and colleges tables, then kept current from commit diffs:
+    a changed program only recomputes its own entry, a changed college only the entries
+    of its programs. versions holds the (programs, colleges) table versions the cache
+    reflects; when they no longer match, it is rebuilt from scratch."""
+
+    def __init__(self):
+        self.versions = None
+        self._programs = {}    # program code -> (name, college code)
+        self._colleges = {}    # college code -> name
+        self._by_college = {}  # college code -> program codes
+        self._joined = {}      # program code -> (program name, college code, college name)
+        self.rebuilds = self.updates = 0
+
+    def rebuild(self, programs, colleges, versions):
+        self._programs, self._colleges, self._by_college, self._joined = {}, {}, {}, {}
+        for c in colleges:
+            self._colleges[c["code"]] = c["name"]
+        for p in programs:
+            self._add_program(p)
+        self.versions = versions
+        self.rebuilds += 1
+
+    def apply(self, changes, versions):
+        """Fold the programs/colleges diffs of one commit into the cache."""
+        touched = set()
+        for _, _, old, _, new in changes.get("colleges", ()):
+            if old is not None:
+                self._colleges.pop(old["code"], None)
+                touched |= self._by_college.get(old["code"], set())
+            if new is not None:
+                self._colleges[new["code"]] = new["name"]
+                touched |= self._by_college.get(new["code"], set())
+        for _, _, old, _, new in changes.get("programs", ()):
+            if old is not None:
+                self._remove_program(old["code"])
+            if new is not None:
+                self._add_program(new)
+        for code in touched:
+            self._join(code)
+        self.versions = versions
+        self.updates += 1
+
+    def _add_program(self, p):
+        self._programs[p["code"]] = (p["name"], p["college_code"])
+        self._by_college.setdefault(p["college_code"], set()).add(p["code"])
+        self._join(p["code"])
+
+    def _remove_program(self, code):
+        name, college = self._programs.pop(code, (None, None))
+        self._by_college.get(college, set()).discard(code)
+        self._joined.pop(code, None)
+
+    def _join(self, code):
+        if code in self._programs:
+            name, college = self._programs[code]
+            self._joined[code] = (name, college, self._colleges.get(college, ""))
+
+    def resolve(self, program_code):
+        return self._joined.get(program_code, ("", "", ""))
+
+
+class Snapshot:
+    """One published, immutable version of all tables, and the search indexes built on it.
+
+    Readers pin a snapshot and read it without taking the data layer's lock; a commit
+    publishes a new snapshot that shares every unchanged table (and its indexes) with the
+    previous one. Once a retired snapshot is no longer pinned it is released."""
+
+    def __init__(self, number, tables, versions, stamps, indexes):
+        self.number = number
+        self.tables = tables      # table -> tuple of row dicts, never modified
+        self.versions = versions  # table -> table version
+        self.stamps = stamps      # table -> stamp of the file the rows match, None if not written yet
+        self.pins = 0
+        self._indexes = indexes   # (table, kind) -> index
+        self._index_lock = threading.Lock()
+
+    def read(self, name):
+        """Copies of the rows of a table, safe to modify."""
+        return [dict(r) for r in self.tables[name]]
+
+    def index(self, table, kind, build):
+        """The index of the given kind over table, built by build(rows) on first use.
+
+        The build runs without the lock, which _publish also takes on the commit path,
+        so a slow build never holds up writers. If two readers build the same index at
+        once, the first to finish installs it and both use that one."""
+        with self._index_lock:
+            index = self._indexes.get((table, kind))
+        if index is not None:
+            return index
+        index = build(self.tables[table])
+        with self._index_lock:
+            return self._indexes.setdefault((table, kind), index)
+
+    def shared_indexes(self, versions):
+        """Indexes still valid for a snapshot with the given table versions."""
+        with self._index_lock:
+            return {k: v for k, v in self._indexes.items() if versions[k[0]] == self.versions[k[0]]}
+
+    def release(self):
+        self.tables = self._indexes = None
+
+
+class UndoEntry:
+    """One committed transaction, kept as row-level diffs so it can be reversed."""
+    def __init__(self, label, changes):
+        self.label = label
+        self.changes = changes  # table -> diff from _diff_rows
+
+
 #  CSV Manager
 class CSVManager:
-    def __init__(self):
+    def __init__(self, flush_interval_ms=0, flush_max_ops=1, compression=STORAGE_COMPRESSION):
+        """flush_interval_ms > 0 turns on write-back mode: commits only update memory and
+        dirty tables are written at most every flush_interval_ms, or as soon as
+        flush_max_ops commits are waiting, on flush(), and at interpreter exit.
+
+        compression ("plain", "gzip" or "zstd") is the format every table file is written
+        in; None keeps each file in the format it is already in."""
+        self.compression = _check_compression(compression)
+        self._lock = threading.RLock()
+        self._tx = None
+        self._undo_stack = []
+        self._redo_stack = []
+        # Committed tables waiting to be written, table -> rows. Later commits to the
+        # same table replace earlier ones, so a burst of edits costs one write per file.
+        self._pending = {}
+        # Parsed tables keyed by the (mtime, size) of the file they came from, table -> (stamp, rows)
+        self._cache = {}
+        self.flush_interval_ms = flush_interval_ms
+        self.flush_max_ops = max(1, flush_max_ops)
+        self._ops_since_flush = 0
+        self._flush_timer = None
+        # Runs a due flush; by default it writes straight away. The GUI swaps in one
+        # that queues flush() on its I/O thread.
+        self.flush_scheduler = None
+        # Called as fn(changes) after every commit, on the committing thread
+        self._listeners = []
+        # Called as fn(names) when tables another program changed are loaded again
+        self._reload_listeners = []
+        self.feed = ChangeFeed()
+        self.history = History(self.feed)
+        self.backups = BackupStore()
+        # Change events of committed but not yet flushed tables, one list per commit
+        self._pending_events = []
+        # Bumped whenever a table's committed rows change, table -> version
+        self._versions = {}
+        # Published Snapshot of the committed tables, and the retired ones still pinned by
+        # readers (number -> Snapshot). Guarded by _snapshot_lock, not the writer lock.
+        self._snapshot = None
+        self._retired = {}
+        self._snapshot_count = 0
+        self._snapshot_lock = threading.Lock()
+        self.results = ResultCache()
+        self.joins = JoinCache()
+        self._join_lock = threading.Lock()
+        self._listeners.append(self._update_joins)
+        # Student shards touched by commits that are not flushed yet
+        self._dirty_shards = set()
+        # Committed rows of a table and key -> position in them, table -> (rows, positions)
+        self._positions = {}
+        # Table -> (rows, file) while restore_backup runs: writing exactly those rows
+        # copies the backed-up file instead of re-encoding it
+        self._restored_files = {}
+        self.student_shards = ShardedTable.open(self)
+        self._recover_commit()
         self.init_csv_files()
+        if self.flush_interval_ms > 0:
+            atexit.register(self.flush)
 
     def init_csv_files(self):
-        if not os.path.exists(COLLEGES_CSV):
-            self.write_colleges([
+        defaults = {
+            "colleges": [
                 {"code": "CCS", "name": "College of Computer Studies"},
                 {"code": "COE", "name": "College of Engineering"},
-            ])
-        if not os.path.exists(PROGRAMS_CSV):
-            self.write_programs([
+            ],
+            "programs": [
                 {"code": "BSCS", "name": "Bachelor of Science in Computer Science", "college_code": "CCS"},
                 {"code": "BSIT", "name": "Bachelor of Science in Information Technology", "college_code": "CCS"},
-            ])
-        if not os.path.exists(STUDENTS_CSV):
-            self.write_students([{
+            ],
+            "students": [{
                 "id": "2024-0001",
                 "first_name": "Shasheenah Deeneille",
                 "last_name": "Lumasag",
                 "gender": "Female",
                 "program_code": "BSCS",
                 "year_level": "3",
-            }])
-
-    def read_colleges(self):  return self._read_csv(COLLEGES_CSV)
-    def read_programs(self):  return self._read_csv(PROGRAMS_CSV)
-    def read_students(self):  return self._read_csv(STUDENTS_CSV)
-
-    def write_colleges(self, rows): self._write_csv(COLLEGES_CSV, ["code", "name"], rows)
-    def write_programs(self, rows): self._write_csv(PROGRAMS_CSV, ["code", "name", "college_code"], rows)
-    def write_students(self, rows): self._write_csv(STUDENTS_CSV, ["id", "first_name", "last_name", "gender", "program_code", "year_level"], rows)
+            }],
+        }
+        for name, rows in defaults.items():
+            path, fieldnames, _ = TABLES[name]
+            if name == "students" and self.student_shards is not None:
+                continue
+            if not os.path.exists(path):
+                self._write_csv(path, fieldnames, rows)
+
+    def read_colleges(self):  return self._read_table("colleges")
+    def read_programs(self):  return self._read_table("programs")
+    def read_students(self):  return self._read_table("students")
+
+    def write_colleges(self, rows): self._write_table("colleges", rows)
+    def write_programs(self, rows): self._write_table("programs", rows)
+    def write_students(self, rows): self._write_table("students", rows)
+
+    def add_listener(self, fn):
+        """Register fn(changes) to be called after each commit with the row-level diffs per table."""
+        self._listeners.append(fn)
+
+    def add_reload_listener(self, fn):
+        """Register fn(names) to be called with the tables loaded again because another
+        program changed their files. No diff exists for those; re-read them."""
+        self._reload_listeners.append(fn)
+
+    #  Transactions
+    @contextmanager
+    def transaction(self, label=None, record=True, check=True):
+        """Group mutations into one atomic commit.
+
+        Reads inside the block see staged rows, writes stay in memory, and on exit the
+        changed tables are validated once (unless check is False) and swapped into place
+        together. An exception discards everything. Nested calls join the outer transaction."""
+        with self._lock:
+            if self._tx is not None:
+                yield self._tx
+                return
+            self._tx = Transaction(label, record, check)
+            try:
+                yield self._tx
+                tx = self._tx
+            finally:
+                self._tx = None
+            self._commit(tx)
+
+    def _load_table(self, name):
+        """Current committed rows of a table: the pending write if any, else the file.
+        The file is only parsed again when its mtime or size changed since the last read."""
+        with self._lock:
+            return [dict(r) for r in self._table_rows(name)]
+
+    def _table_rows(self, name):
+        """Like _load_table, but the shared list itself; callers must not modify it."""
+        with self._lock:
+            if name in self._pending:
+                return self._pending[name]
+            stamp = self._table_stamp(name)
+            cached = self._cache.get(name)
+            if cached is None or cached[0] != stamp:
+                if name == "students" and self.student_shards is not None:
+                    cached = (stamp, self.student_shards.read_all())
+                else:
+                    cached = (stamp, self._read_csv(TABLES[name][0]))
+                self._cache[name] = cached
+                self._versions[name] = self._versions.get(name, 0) + 1
+            return cached[1]
+
+    def table_version(self, name):
+        """A number that changes whenever the committed rows of the table change,
+        whether by a commit here or by another program rewriting the file."""
+        with self.snapshot() as snap:
+            return snap.versions[name]
+
+    #  Snapshots
+    @contextmanager
+    def snapshot(self):
+        """Pin the latest committed version of all tables for a consistent read.
+
+        Reading a snapshot takes no lock, so long reports neither wait for nor block
+        writers, and never see a commit halfway through:
+
+            with manager.snapshot() as snap:
+                students = snap.tables["students"]  # read-only rows
+        """
+        snap = self._pin_snapshot()
+        try:
+            yield snap
+        finally:
+            self._unpin_snapshot(snap)
+
+    def _pin_snapshot(self):
+        for _ in range(5):
+            with self._snapshot_lock:
+                snap = self._snapshot
+                if snap is not None and self._snapshot_current(snap):
+                    snap.pins += 1
+                    return snap
+            # First read, or another program rewrote a file: load the files and publish
+            with self._lock:
+                self._wait_for_commit_journal()
+                self._publish()
+        with self._snapshot_lock:
+            self._snapshot.pins += 1
+            return self._snapshot
+
+    def _unpin_snapshot(self, snap):
+        with self._snapshot_lock:
+            snap.pins -= 1
+            if snap.pins == 0 and snap is not self._snapshot:
+                self._retired.pop(snap.number, None)
+                snap.release()
+
+    def _snapshot_current(self, snap):
+        return all(stamp is None or stamp == self._table_stamp(name) for name, stamp in snap.stamps.items())
+
+    def _publish(self, committed=()):
+        """Make the committed tables the current snapshot. Caller holds the writer lock.
+        committed names the tables whose version the calling commit bumped."""
+        prev = self._snapshot
+        tables, versions, stamps = {}, {}, {}
+        for name in TABLES:
+            rows = self._table_rows(name)
+            versions[name] = self._versions.get(name, 0)
+            stamps[name] = None if name in self._pending else self._cache[name][0]
+            if prev is not None and prev.versions[name] == versions[name]:
+                tables[name] = prev.tables[name]
+            else:
+                tables[name] = tuple(rows)
+        indexes = prev.shared_indexes(versions) if prev is not None else {}
+        with self._snapshot_lock:
+            self._snapshot_count += 1
+            snap = Snapshot(self._snapshot_count, tables, versions, stamps, indexes)
+            old, self._snapshot = self._snapshot, snap
+            if old is not None:
+                if old.pins:
+                    self._retired[old.number] = old
+                else:
+                    old.release()
+        self.results.discard_stale(versions)
+        if prev is not None:
+            reloaded = [name for name in TABLES
+                        if versions[name] - prev.versions[name] > (name in committed)]
+            if reloaded:
+                for fn in self._reload_listeners:
+                    fn(reloaded)
+
+    def _wait_for_commit_journal(self, timeout=2.0):
+        """Give another instance that is swapping its files in time to finish, so the
+        files are not read half old, half new."""
+        deadline = time.monotonic() + timeout
+        while os.path.exists(COMMIT_JOURNAL) and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+    def snapshot_stats(self):
+        with self._snapshot_lock:
+            snap = self._snapshot
+            return {"current": snap.number if snap else None, "current_pins": snap.pins if snap else 0,
+                    "retired_pinned": sorted(self._retired)}
+
+    def _own_tx(self):
+        """The transaction open on this thread, if any."""
+        tx = self._tx
+        return tx if tx is not None and tx.owner == threading.get_ident() else None
+
+    def _table_stamp(self, name):
+        if name == "students" and self.student_shards is not None:
+            return self.student_shards.stamp()
+        return self._file_stamp(TABLES[name][0])
+
+    @staticmethod
+    def _file_stamp(path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _read_table(self, name):
+        if self._own_tx() is None:
+            with self.snapshot() as snap:
+                return snap.read(name)
+        with self._lock:
+            tx = self._tx
+            self._stage_whole(tx, name)
+            return [dict(r) for r in tx.staged.get(name, tx.base[name])]
+
+    def _write_table(self, name, rows):
+        with self.transaction() as tx:
+            self._tx_base(tx, name)
+            tx.staged[name] = list(rows)
+            for edits in (tx.edits, tx.added, tx.current):
+                edits.pop(name, None)
+
+    def _tx_base(self, tx, name):
+        if name not in tx.base:
+            tx.base[name] = self._table_rows(name)
+        return tx.base[name]
+
+    def _key_positions(self, name, rows):
+        """key -> position of its first row in rows, the committed rows of table name.
+        Carried over by commits that only edit or append rows (see _carry_positions)."""
+        cached = self._positions.get(name)
+        if cached is None or cached[0] is not rows:
+            key = TABLES[name][2]
+            cached = (rows, {rows[i][key]: i for i in range(len(rows) - 1, -1, -1)})
+            self._positions[name] = cached
+        return cached[1]
+
+    #  Single-row edits
+    def _get_row(self, name, key):
+        """Copy of the row with key as the open transaction sees it, or None."""
+        tx = self._tx
+        base = self._tx_base(tx, name)
+        field = TABLES[name][2]
+        if name in tx.staged:
+            row = next((r for r in tx.staged[name] if r[field] == key), None)
+        elif key in tx.current.get(name, ()):
+            row = tx.current[name][key]
+        elif key in tx.edits.get(name, ()):
+            row = None  # deleted or renamed in this transaction
+        else:
+            pos = self._key_positions(name, base).get(key)
+            row = None if pos is None else base[pos]
+        return None if row is None else dict(row)
+
+    def _find_rows(self, name, match):
+        """Copies of the rows match(row) accepts, as the open transaction sees them.
+        Only the matches are copied."""
+        tx = self._tx
+        base = self._tx_base(tx, name)
+        if name in tx.staged:
+            return [dict(r) for r in tx.staged[name] if match(r)]
+        field = TABLES[name][2]
+        edits = tx.edits.get(name, {})
+        positions = self._key_positions(name, base) if edits else {}
+        found = []
+        for i, r in enumerate(base):
+            k = r[field]
+            if k in edits and positions[k] == i:
+                r = edits[k]
+            if r is not None and match(r):
+                found.append(dict(r))
+        found.extend(dict(r) for r in tx.added.get(name, ()) if match(r))
+        return found
+
+    def _put_row(self, name, key, row):
+        """Stage row in place of the row with key (row None deletes it), or append row
+        when key is None. A key that is not there is ignored."""
+        tx = self._tx
+        base = self._tx_base(tx, name)
+        field = TABLES[name][2]
+        current = tx.current.setdefault(name, {})
+        edits = tx.edits.setdefault(name, {})
+        if name not in tx.staged and key is not None and (key in current or key in edits):
+            # A second edit of the same row: stage the whole table instead
+            self._stage_whole(tx, name)
+        if name in tx.staged:
+            rows = tx.staged[name]
+            if key is None:
+                rows.append(row)
+                return
+            pos = next((i for i, r in enumerate(rows) if r[field] == key), None)
+            if pos is not None and row is None:
+                del rows[pos]
+            elif pos is not None:
+                rows[pos] = row
+            return
+        if key is None:
+            tx.added.setdefault(name, []).append(row)
+        elif key in self._key_positions(name, base):
+            edits[key] = row
+        else:
+            return
+        if row is not None:
+            current[row[field]] = row
+
+    def _stage_whole(self, tx, name):
+        """Turn the single-row edits of a table into a staged copy of the whole table."""
+        self._tx_base(tx, name)
+        if tx.edits.get(name) or tx.added.get(name):
+            tx.staged[name] = self._apply_row_edits(tx, name)[0]
+        for edits in (tx.edits, tx.added, tx.current):
+            edits.pop(name, None)
+
+    def _apply_row_edits(self, tx, name):
+        """The committed rows with the transaction's single-row edits applied, and their
+        diff (the same as _diff_rows would give), worked out from the edited rows alone."""
+        field = TABLES[name][2]
+        base = tx.base[name]
+        positions = self._key_positions(name, base)
+        edits = tx.edits.get(name, {})
+        rows = list(base)
+        deleted = sorted(positions[k] for k, row in edits.items() if row is None)
+        for k, row in edits.items():
+            if row is not None:
+                rows[positions[k]] = row
+        for pos in reversed(deleted):
+            del rows[pos]
+        diff, gone, inserted = [], {}, []
+        for k, row in edits.items():
+            pos = positions[k]
+            if row is None or row[field] != k:
+                gone[k] = pos
+            if row is None:
+                continue
+            new_pos = pos - bisect.bisect_left(deleted, pos)
+            if row[field] != k:
+                inserted.append((new_pos, row))
+            elif row != base[pos]:
+                diff.append((k, pos, base[pos], new_pos, row))
+        for row in tx.added.get(name, ()):
+            inserted.append((len(rows), row))
+            rows.append(row)
+        # As in _diff_rows, a key that leaves one row and lands on another is an update
+        for new_pos, row in inserted:
+            pos = gone.pop(row[field], None)
+            if pos is None:
+                diff.append((row[field], None, None, new_pos, row))
+            elif row != base[pos]:
+                diff.append((row[field], pos, base[pos], new_pos, row))
+        diff.extend((k, pos, base[pos], None, None) for k, pos in gone.items())
+        return rows, diff
+
+    def _carry_positions(self, tx, name, rows):
+        """Move the key positions of a commit's old rows over to its new rows, when the
+        commit only edited rows in place or appended some."""
+        cached = self._positions.get(name)
+        edits = tx.edits.get(name, {})
+        if cached is None or cached[0] is not tx.base[name] or any(row is None for row in edits.values()):
+            return
+        field = TABLES[name][2]
+        positions = cached[1]
+        added = tx.added.get(name, [])
+        moved = {k: row[field] for k, row in edits.items() if row[field] != k}
+        new_keys = list(moved.values()) + [row[field] for row in added]
+        if len(set(new_keys)) != len(new_keys) or any(k in positions and k not in moved for k in new_keys):
+            self._positions.pop(name)  # duplicate keys; rebuild when next needed
+            return
+        pos_of = {k: positions.pop(k) for k in moved}
+        for k, new_key in moved.items():
+            positions[new_key] = pos_of[k]
+        for i, row in enumerate(added, len(rows) - len(added)):
+            positions[row[field]] = i
+        self._positions[name] = (rows, positions)
+
+    def _commit(self, tx):
+        changes, final = {}, {}
+        for name in set(tx.staged) | set(tx.edits) | set(tx.added):
+            if name in tx.staged:
+                rows = tx.staged[name]
+                diff = _diff_rows(TABLES[name][2], tx.base[name], rows)
+            else:
+                rows, diff = self._apply_row_edits(tx, name)
+            if diff:
+                changes[name], final[name] = diff, rows
+        if not changes:
+            return changes
+        if tx.check:
+            self._check_constraints(tx, changes, final)
+        for name in changes:
+            self._pending[name] = final[name]
+            self._versions[name] = self._versions.get(name, 0) + 1
+            if name not in tx.staged:
+                self._carry_positions(tx, name, final[name])
+        if self.student_shards is not None and "students" in changes:
+            self._dirty_shards |= self.student_shards.keys_touched(changes["students"])
+        self._pending_events.append(self.feed.make_events(tx.label or "Edit", changes))
+        self._publish(changes)
+        if tx.record:
+            self._undo_stack.append(UndoEntry(tx.label or "Edit", changes))
+            del self._undo_stack[:-UNDO_LIMIT]
+            self._redo_stack.clear()
+        for fn in self._listeners:
+            fn(changes)
+        self._ops_since_flush += 1
+        if self.flush_interval_ms <= 0 or self._ops_since_flush >= self.flush_max_ops:
+            self._request_flush()
+        elif self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.flush_interval_ms / 1000, self._request_flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+        return changes
+
+    def _request_flush(self):
+        if self.flush_scheduler is None:
+            self.flush()
+        else:
+            self.flush_scheduler()
+
+    def flush(self):
+        """Write every dirty table to disk in one atomic swap. Clean tables are not touched."""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            self._ops_since_flush = 0
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            events, self._pending_events = self._pending_events, []
+            with self.feed.lock():
+                try:
+                    if not self.history.checkpoints():
+                        # First change ever logged: keep the data as it was before it,
+                        # dated from when its files were last written
+                        self.history.checkpoint(self.feed.read_last_seq(), self._all_tables(),
+                                                max(map(os.path.getmtime, self._data_files()), default=None))
+                    # Events go to the log before the swap, so a crash cannot leave data
+                    # on disk whose changes were never logged
+                    self.feed.append(events)
+                    events = []
+                    self._replace_files(pending)
+                except OSError:
+                    for name, rows in pending.items():
+                        self._pending.setdefault(name, rows)
+                    self._pending_events[:0] = events
+                    raise
+                self._dirty_shards.clear()
+                for name, rows in pending.items():
+                    self._cache[name] = (self._table_stamp(name), rows)
+                # Still under the log lock, the files hold exactly the data as of the last
+                # logged event, whichever program logged it
+                self.history.maybe_checkpoint(self.feed.read_last_seq(), self._all_tables)
+            with self._snapshot_lock:
+                snap = self._snapshot
+                if snap is not None:
+                    # Same rows, now on disk: record the new files so they do not look changed
+                    snap.stamps = dict(snap.stamps, **{name: self._cache[name][0] for name in pending
+                                                       if snap.versions[name] == self._versions.get(name, 0)})
+
+    def _all_tables(self):
+        return {name: self._load_table(name) for name in TABLES}
+
+    #  History
+    def tables_as_of(self, when):
+        """All tables as they were at a datetime or UNIX timestamp."""
+        ts = when.timestamp() if isinstance(when, datetime) else when
+        return self.history.at(ts=ts)
+
+    def diff_versions(self, from_seq, to_seq=None):
+        """Row-level differences between two change-feed sequence numbers (to_seq defaults to now)."""
+        return self.history.diff(from_seq, self.feed.read_last_seq() if to_seq is None else to_seq)
+
+    def restore_as_of(self, when):
+        """Put every table back the way it was at when, as one undoable transaction.
+        The rows go back exactly as they were, so references are not re-checked."""
+        tables = self.tables_as_of(when)
+        stamp = datetime.fromtimestamp(when.timestamp() if isinstance(when, datetime) else when)
+        with self.transaction(f"Restore data as of {stamp:%Y-%m-%d %H:%M}", check=False):
+            for name, rows in tables.items():
+                self._write_table(name, rows)
+
+    #  Backups
+    def backup(self, label=None, rotate=True):
+        """Take an incremental backup of the data files and apply the rotation policy.
+        Returns the new backup's manifest."""
+        # The backup directory stays locked from choosing the files that are unchanged
+        # since the latest point until the new point that relies on its chunks is saved
+        with self.backups.lock():
+            with self._lock:
+                self.flush()
+                points = self.backups.points()
+                latest = points[-1] if points else None
+                files = {}
+                # Only reading happens under the writer lock, so the files are from one
+                # commit; chunking and storing them does not hold up writers
+                for rel in self._data_files():
+                    stamp = self._file_stamp(rel)
+                    if self.backups.unchanged(rel, stamp, latest):
+                        files[rel] = (stamp, None)
+                    else:
+                        with open(rel, "rb") as f:
+                            files[rel] = (stamp, f.read())
+            point = self.backups.backup(files, label)
+            if rotate:
+                point["rotated_out"] = self.backups.rotate()
+        return point
+
+    def _data_files(self):
+        files = [COLLEGES_CSV, PROGRAMS_CSV]
+        shards = self.student_shards
+        if shards is None:
+            files.append(STUDENTS_CSV)
+        else:
+            files += [os.path.join(shards.directory, info["file"]) for info in shards.shards.values()]
+            files.append(shards.manifest_path)
+        return [f for f in files if os.path.exists(f)]
+
+    def restore_backup(self, point_id):
+        """Put the tables of a backup back as one undoable transaction. The rows go back
+        exactly as they were saved, so references are not re-checked, and a table file
+        in the same layout and format as its backup is restored byte for byte. Otherwise
+        the current storage layout (sharded or not, compression) is kept."""
+        tmp = os.path.join(self.backups.directory, "restore.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        try:
+            files = self.backups.rebuild(point_id, tmp)
+            tables = {name: self._read_csv(os.path.join(tmp, TABLES[name][0])) for name in ("colleges", "programs")}
+            shards = ShardedTable.open(self, os.path.join(tmp, STUDENT_SHARD_DIR))
+            tables["students"] = shards.read_all() if shards is not None else self._read_csv(os.path.join(tmp, STUDENTS_CSV))
+            with self._lock:
+                for name, rows in tables.items():
+                    path = TABLES[name][0]
+                    saved = os.path.join(tmp, path)
+                    if name == "students" and (shards is not None or self.student_shards is not None):
+                        continue
+                    if (self.compression or _detect_compression(path)) == _detect_compression(saved):
+                        self._restored_files[name] = (rows, saved)
+                try:
+                    with self.transaction(f"Restore backup {point_id}", check=False):
+                        for name, rows in tables.items():
+                            self._write_table(name, rows)
+                    self.flush()
+                finally:
+                    self._restored_files = {}
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        return files
+
+    def changes_since(self, seq, limit=None):
+        """Change events written to disk after seq (see ChangeFeed)."""
+        return self.feed.since(seq, limit)
+
+    def has_pending_writes(self):
+        return bool(self._pending)
+
+    def dirty_tables(self):
+        """Names of the tables with committed changes not yet written to disk."""
+        with self._lock:
+            return sorted(self._pending)
+
+    def _check_constraints(self, tx, changes, final):
+        """Validate the rows touched by a commit (final holds the new rows of each changed
+        table): unique keys and existing references."""
+        def _codes(name):
+            return {r["code"] for r in (final[name] if name in final else self._table_rows(name))}
+
+        for name, diff in changes.items():
+            key = TABLES[name][2]
+            seen = set()
+            if name in tx.staged:
+                touched = {k for k, _, _, _, new in diff if new is not None}
+                for r in final[name]:
+                    k = r[key]
+                    if k in touched:
+                        if k in seen:
+                            raise ValueError(f"Duplicate {key} '{k}' in {name}!")
+                        seen.add(k)
+                continue
+            # Single-row edits: a new key must not be taken by a row that stays in place
+            positions = self._key_positions(name, tx.base[name])
+            edits = tx.edits.get(name, {})
+            moved = {k for k, row in edits.items() if row is None or row[key] != k}
+            for k, old_pos, _, _, new in diff:
+                if new is None:
+                    continue
+                if k in seen or (old_pos is None and k in positions and k not in moved):
+                    raise ValueError(f"Duplicate {key} '{k}' in {name}!")
+                seen.add(k)
+
+        references = {"programs": ("college_code", "colleges"), "students": ("program_code", "programs")}
+        for name, (field, target) in references.items():
+            if name not in changes:
+                continue
+            codes = None
+            for _, _, old, _, new in changes[name]:
+                if new is None or _is_null(new[field]) or (old is not None and old[field] == new[field]):
+                    continue
+                if codes is None:
+                    codes = _codes(target)
+                if new[field] not in codes:
+                    raise ValueError(f"{target[:-1].capitalize()} code '{new[field]}' does not exist!")
+
+    def _replace_files(self, tables):
+        """Write each table to a temp file, then swap them all in. With more than one file,
+        a journal makes the swap all-or-nothing across a crash (see _recover_commit)."""
+        moves = []
+        for name, rows in tables.items():
+            if name == "students" and self.student_shards is not None:
+                moves.extend(self.student_shards.prepare_write(rows, self._dirty_shards))
+                continue
+            path, fieldnames, _ = TABLES[name]
+            tmp = path + ".tmp"
+            restored = self._restored_files.get(name)
+            if restored is not None and restored[0] == rows:
+                shutil.copyfile(restored[1], tmp)
+            else:
+                self._write_csv(tmp, fieldnames, rows)
+            moves.append((tmp, path))
+        if len(moves) == 1:
+            os.replace(*moves[0])
+            return
+        with open(COMMIT_JOURNAL, "w", encoding="utf-8") as f:
+            json.dump(moves, f)
+        self._recover_commit()
+
+    def _recover_commit(self):
+        """Finish a journaled commit interrupted mid-swap; discard temp files from one that never got that far."""
+        if os.path.exists(COMMIT_JOURNAL):
+            with open(COMMIT_JOURNAL, encoding="utf-8") as f:
+                moves = json.load(f)
+            for tmp, path in moves:
+                if os.path.exists(tmp):
+                    os.replace(tmp, path)
+            os.remove(COMMIT_JOURNAL)
+        stray = [path + ".tmp" for path, _, _ in TABLES.values()]
+        if os.path.isdir(STUDENT_SHARD_DIR):
+            stray += [os.path.join(STUDENT_SHARD_DIR, f) for f in os.listdir(STUDENT_SHARD_DIR) if f.endswith(".tmp")]
+        for tmp in stray:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def convert_storage(self, compression):
+        """Rewrite every table file in the given format ("plain", "gzip" or "zstd")."""
+        with self._lock:
+            _check_compression(compression)
+            self.flush()
+            self.compression = compression
+            tables = {name: self._load_table(name) for name in TABLES}
+            if self.student_shards is not None:
+                self._dirty_shards = set(self.student_shards.shards)
+            self._replace_files(tables)
+            self._dirty_shards.clear()
+            for name, rows in tables.items():
+                self._cache[name] = (self._table_stamp(name), rows)
+
+    #  Student shards
+    def shard_students(self, partition="year"):
+        """Move students.csv into the sharded layout, partitioned by "year" or "program"."""
+        if partition not in ("year", "program"):
+            raise ValueError("Partition must be 'year' or 'program'.")
+        with self._lock:
+            if self.student_shards is not None:
+                raise ValueError("Students are already sharded.")
+            self.flush()
+            rows = self._load_table("students")
+            self.student_shards = ShardedTable.create(self, rows, partition)
+            os.remove(STUDENTS_CSV)
+            self._cache.pop("students", None)
+            return len(self.student_shards.shards)
+
+    def merge_student_shards(self):
+        """Move the sharded layout back into a single students.csv."""
+        with self._lock:
+            if self.student_shards is None:
+                raise ValueError("Students are not sharded.")
+            self.flush()
+            rows = self._load_table("students")
+            self._write_csv(STUDENTS_CSV + ".tmp", TABLES["students"][1], rows)
+            os.replace(STUDENTS_CSV + ".tmp", STUDENTS_CSV)
+            shards, self.student_shards = self.student_shards, None
+            for info in shards.shards.values():
+                os.remove(os.path.join(shards.directory, info["file"]))
+            os.remove(shards.manifest_path)
+            self._cache.pop("students", None)
+
+    #  Undo / redo
+    def can_undo(self):  return bool(self._undo_stack)
+    def can_redo(self):  return bool(self._redo_stack)
+
+    def undo(self):
+        """Reverse the most recent commit. Returns its label, or None if there is nothing to undo."""
+        return self._replay(self._undo_stack, self._redo_stack, inverse=True)
+
+    def redo(self):
+        """Re-apply the most recently undone commit. Returns its label, or None."""
+        return self._replay(self._redo_stack, self._undo_stack, inverse=False)
+
+    def _replay(self, source, target, inverse):
+        if not source:
+            return None
+        entry = source[-1]
+        # Rows put back by undo/redo were valid data once (or are what a repair fixed),
+        # so they go in as they were
+        with self.transaction(entry.label, record=False, check=False):
+            for name, diff in entry.changes.items():
+                rows = self._read_table(name)
+                self._write_table(name, _apply_diff(TABLES[name][2], rows, diff, inverse))
+        target.append(source.pop())
+        return entry.label
 
     def _read_csv(self, filepath):
-        if not os.path.exists(filepath):
-            return []
-        with open(filepath, newline="", encoding="utf-8") as f:
-            return list(csv.DictReader(f))
+        return read_csv_file(filepath)
 
     def _write_csv(self, filepath, fieldnames, rows):
-        with open(filepath, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
+        write_csv_file(filepath, fieldnames, rows, self.compression)
 
     #  College operations
     def add_college(self, code, name):
-        colleges = self.read_colleges()
-        if any(c["code"] == code for c in colleges):
-            raise ValueError("College code already exists!")
-        colleges.append({"code": code, "name": name})
-        self.write_colleges(colleges)
+        with self.transaction(f"Add college {code}"):
+            if self._get_row("colleges", code) is not None:
+                raise ValueError("College code already exists!")
+            self._put_row("colleges", None, {"code": code, "name": name})
 
     def edit_college(self, old_code, new_code, new_name):
-        colleges = self.read_colleges()
-        if new_code != old_code and any(c["code"] == new_code for c in colleges):
-            raise ValueError("College code already exists!")
-        for c in colleges:
-            if c["code"] == old_code:
+        with self.transaction(f"Edit college {old_code}"):
+            if new_code != old_code and self._get_row("colleges", new_code) is not None:
+                raise ValueError("College code already exists!")
+            c = self._get_row("colleges", old_code)
+            if c is not None:
                 c["code"] = new_code
                 c["name"] = new_name
-        self.write_colleges(colleges)
+                self._put_row("colleges", old_code, c)
 
-        if old_code != new_code:
-            programs = self.read_programs()
-            for p in programs:
-                if p["college_code"] == old_code:
+            if old_code != new_code:
+                for p in self._find_rows("programs", lambda p: p["college_code"] == old_code):
                     p["college_code"] = new_code
-            self.write_programs(programs)
+                    self._put_row("programs", p["code"], p)
 
     def delete_college(self, code):
-        self.write_colleges([c for c in self.read_colleges() if c["code"] != code])
-        programs = self.read_programs()
-        for p in programs:
-            if p["college_code"] == code:
+        with self.transaction(f"Delete college {code}"):
+            self._put_row("colleges", code, None)
+            for p in self._find_rows("programs", lambda p: p["college_code"] == code):
                 p["college_code"] = NULL_DISPLAY
-        self.write_programs(programs)
+                self._put_row("programs", p["code"], p)
 
     def college_has_programs(self, code):
         return any(p["college_code"] == code for p in self.read_programs())
 
     #  Program operations
     def add_program(self, code, name, college_code):
-        programs = self.read_programs()
-        if any(p["code"] == code for p in programs):
-            raise ValueError("Program code already exists!")
-        programs.append({"code": code, "name": name, "college_code": college_code})
-        self.write_programs(programs)
+        with self.transaction(f"Add program {code}"):
+            if self._get_row("programs", code) is not None:
+                raise ValueError("Program code already exists!")
+            self._put_row("programs", None, {"code": code, "name": name, "college_code": college_code})
 
     def edit_program(self, old_code, new_code, new_name, new_college_code):
-        programs = self.read_programs()
-        if new_code != old_code and any(p["code"] == new_code for p in programs):
-            raise ValueError("Program code already exists!")
-        for p in programs:
-            if p["code"] == old_code:
+        with self.transaction(f"Edit program {old_code}"):
+            if new_code != old_code and self._get_row("programs", new_code) is not None:
+                raise ValueError("Program code already exists!")
+            p = self._get_row("programs", old_code)
+            if p is not None:
                 p["code"] = new_code
                 p["name"] = new_name
                 p["college_code"] = new_college_code
-        self.write_programs(programs)
+                self._put_row("programs", old_code, p)
 
-        if old_code != new_code:
-            students = self.read_students()
-            for s in students:
-                if s["program_code"] == old_code:
+            if old_code != new_code:
+                for s in self._find_rows("students", lambda s: s["program_code"] == old_code):
                     s["program_code"] = new_code
-            self.write_students(students)
+                    self._put_row("students", s["id"], s)
 
     def delete_program(self, code):
-        self.write_programs([p for p in self.read_programs() if p["code"] != code])
-
-        students = self.read_students()
-        for s in students:
-            if s["program_code"] == code:
+        with self.transaction(f"Delete program {code}"):
+            self._put_row("programs", code, None)
+            for s in self._find_rows("students", lambda s: s["program_code"] == code):
                 s["program_code"] = NULL_DISPLAY
-        self.write_students(students)
+                self._put_row("students", s["id"], s)
 
     def program_has_students(self, code):
         return any(s["program_code"] == code for s in self.read_students())
 
     #  Student operations
     def add_student(self, sid, first_name, last_name, gender, program_code, year_level):
-        students = self.read_students()
-        if any(s["id"] == sid for s in students):
-            raise ValueError("Student ID already exists!")
-        students.append({"id": sid, "first_name": first_name, "last_name": last_name,
-                         "gender": gender, "program_code": program_code, "year_level": year_level})
-        self.write_students(students)
+        with self.transaction(f"Add student {sid}"):
+            if self._get_row("students", sid) is not None:
+                raise ValueError("Student ID already exists!")
+            self._put_row("students", None, {
+                "id": sid, "first_name": first_name, "last_name": last_name,
+                "gender": gender, "program_code": program_code, "year_level": year_level})
 
     def edit_student(self, old_id, new_id, first_name, last_name, gender, program_code, year_level):
-        students = self.read_students()
-        if new_id != old_id and any(s["id"] == new_id for s in students):
-            raise ValueError("Student ID already exists!")
-        for s in students:
-            if s["id"] == old_id:
+        with self.transaction(f"Edit student {old_id}"):
+            if new_id != old_id and self._get_row("students", new_id) is not None:
+                raise ValueError("Student ID already exists!")
+            s = self._get_row("students", old_id)
+            if s is not None:
                 s["id"] = new_id
                 s["first_name"] = first_name
                 s["last_name"] = last_name
                 s["gender"] = gender
                 s["program_code"] = program_code
                 s["year_level"] = year_level
-        self.write_students(students)
+                self._put_row("students", old_id, s)
 
     def delete_student(self, sid):
-        self.write_students([s for s in self.read_students() if s["id"] != sid])
+        with self.transaction(f"Delete student {sid}"):
+            self._put_row("students", sid, None)
+
+    #  Batch student operations (one pass, one write)
+    def delete_students(self, sids):
+        """Delete every student whose id is in sids. Returns the number removed."""
+        sids = set(sids)
+        with self.transaction(f"Delete {len(sids)} students"):
+            removed = self._find_rows("students", lambda s: s["id"] in sids)
+            for s in removed:
+                self._put_row("students", s["id"], None)
+        return len(removed)
+
+    def reassign_students_program(self, sids, program_code):
+        """Move every student in sids to program_code. Returns the number changed."""
+        def _reassign(s):
+            if s["program_code"] == program_code:
+                return False
+            s["program_code"] = program_code
+            return True
+        return self._update_students(sids, _reassign, f"Reassign students to {program_code}")
+
+    def promote_students(self, sids=None, max_year=4):
+        """Raise year_level by one for sids (all students if None), capped at max_year.
+        Returns the number promoted."""
+        def _promote(s):
+            try:
+                year = int(s["year_level"])
+            except ValueError:
+                return False
+            if year >= max_year:
+                return False
+            s["year_level"] = str(year + 1)
+            return True
+        return self._update_students(sids, _promote, "Promote students")
+
+    def _update_students(self, sids, update, label):
+        """Apply update(student) -> bool to the selected students in a single pass.
+        Only the rows that changed are staged."""
+        sids = None if sids is None else set(sids)
+        with self.transaction(label):
+            changed = 0
+            for s in self._find_rows("students", lambda s: sids is None or s["id"] in sids):
+                if update(s):
+                    self._put_row("students", s["id"], s)
+                    changed += 1
+        return changed
 
     def search_students(self, field, value):
-        return [s for s in self.read_students() if value.lower() in s.get(field, "").lower()]
+        shards = self.student_shards
+        value = value.lower()
+        if field == "id" and shards is not None and "students" not in self._pending and self._own_tx() is None:
+            # Every committed student is on disk: read only the shards that can hold a
+            # matching id (each is parsed again only when its file changes)
+            keys = shards.keys_for_id_query(value)
+            if self._snapshot is None or len(keys) < len(shards.shards):
+                return [dict(s) for s in shards.iter_rows(keys) if value in s.get("id", "").lower()]
+        return self._cached_result("students", ("search", field, value), None, lambda rows, snap: [
+            i for i, s in enumerate(rows) if value in s.get(field, "").lower()])
+
+    def fuzzy_search(self, table, query, limit=200):
+        """Rows of table whose FUZZY_FIELDS match every word of query with a few typos
+        allowed, closest first. The index is rebuilt only after the table changed."""
+        with self.snapshot() as snap:
+            index = snap.index(table, "fuzzy", lambda rows: FuzzyIndex(rows, TABLES[table][2], FUZZY_FIELDS[table]))
+            return [dict(row) for _, row in index.search(query, limit)]
+
+    def query(self, table, conditions, sort=None):
+        """Rows of table matching every (field, op, value) condition, in table order or
+        sorted by the sort field. op is "=" (case-insensitive equality) or "contains";
+        see parse_query."""
+        fields = TABLES[table][1]
+        for field, op, _ in conditions:
+            if field not in fields:
+                raise ValueError(f"Unknown field '{field}'. Use one of: {', '.join(fields)}.")
+            if op not in QUERY_OPS:
+                raise ValueError(f"Unknown operator '{op}'.")
+        conditions = tuple((field, QUERY_OPS[op], value.lower()) for field, op, value in conditions)
+        def _run(rows, snap):
+            if snap is None:
+                # Staged rows of an open transaction; the indexes only cover committed ones
+                positions = [i for i, r in enumerate(rows) if all(
+                    (r.get(f) or "").lower() == v if op == "=" else v in (r.get(f) or "").lower()
+                    for f, op, v in conditions)]
+            else:
+                positions = snap.index(table, "query", QueryIndex).run(conditions)
+            if sort is not None:
+                positions.sort(key=lambda i: rows[i].get(sort, "").lower())
+            return positions
+        return self._cached_result(table, ("query",) + conditions, sort, _run)
 
     def sort_students(self, field):
-        return sorted(self.read_students(), key=lambda s: s.get(field, "").lower())
+        return self._sorted("students", field)
+
+    def join_students(self, students):
+        """Copies of students with program_name, college_code and college_name filled in
+        from the join cache, one dictionary lookup per row."""
+        with self.snapshot() as snap, self._join_lock:
+            versions = (snap.versions["programs"], snap.versions["colleges"])
+            if self.joins.versions != versions:
+                self.joins.rebuild(snap.tables["programs"], snap.tables["colleges"], versions)
+            resolve = self.joins.resolve
+            joined = []
+            for s in students:
+                row = dict(s)
+                row["program_name"], row["college_code"], row["college_name"] = resolve(s.get("program_code"))
+                joined.append(row)
+            return joined
+
+    def _update_joins(self, changes):
+        """Commit listener: patch the join cache with the program/college diffs, if it was
+        current before this commit (each changed table's version went up by one)."""
+        if "programs" not in changes and "colleges" not in changes:
+            return
+        after = (self._versions.get("programs", 0), self._versions.get("colleges", 0))
+        before = (after[0] - ("programs" in changes), after[1] - ("colleges" in changes))
+        with self._join_lock:
+            if self.joins.versions != before:
+                return
+            for name in ("programs", "colleges"):
+                deleted = {k for k, _, _, _, new in changes.get(name, ()) if new is None}
+                if deleted and deleted & {r["code"] for r in self._table_rows(name)}:
+                    # A dropped duplicate leaves its code behind; rebuild on the next join
+                    self.joins.versions = None
+                    return
+            self.joins.apply(changes, after)
 
     def search_colleges(self, value):
-        return [c for c in self.read_colleges() if
-                value.lower() in c["code"].lower() or value.lower() in c["name"].lower()]
+        value = value.lower()
+        return self._cached_result("colleges", ("search", value), None, lambda rows, snap: [
+            i for i, c in enumerate(rows) if value in c["code"].lower() or value in c["name"].lower()])
 
     def sort_colleges(self, field):
-        return sorted(self.read_colleges(), key=lambda c: c.get(field, "").lower())
+        return self._sorted("colleges", field)
 
     def search_programs(self, value):
-        return [p for p in self.read_programs() if
-                value.lower() in p["code"].lower() or value.lower() in p["name"].lower() or
-                value.lower() in p["college_code"].lower()]
+        value = value.lower()
+        return self._cached_result("programs", ("search", value), None, lambda rows, snap: [
+            i for i, p in enumerate(rows) if value in p["code"].lower() or value in p["name"].lower() or
+            value in p["college_code"].lower()])
 
     def sort_programs(self, field):
-        return sorted(self.read_programs(), key=lambda p: p.get(field, "").lower())
+        return self._sorted("programs", field)
+
+    def _sorted(self, table, field):
+        return self._cached_result(table, None, field, lambda rows, snap: sorted(
+            range(len(rows)), key=lambda i: rows[i].get(field, "").lower()))
+
+    def _cached_result(self, table, filters, sort, compute):
+        """Rows of table picked by compute(rows, snapshot) -> positions, memoised in
+        self.results under (table, filters, sort) for the table version of the snapshot.
+        Inside a transaction the staged rows are used (snapshot None) and nothing is cached."""
+        if self._own_tx() is not None:
+            rows = self._read_table(table)
+            return [rows[i] for i in compute(rows, None)]
+        with self.snapshot() as snap:
+            rows = snap.tables[table]
+            version = snap.versions[table]
+            key = (table, filters, sort)
+            positions = self.results.get(key, version)
+            if positions is None:
+                positions = array("i", compute(rows, snap))
+                self.results.put(key, version, positions)
+            return [dict(rows[i]) for i in positions]
+
+    #  Integrity checks
+    def check_integrity(self):
+        """Scan all three tables once and return a list of IntegrityIssue.
+
+        Keys are checked for format and duplicates while building hash sets of the
+        college and program codes, which the foreign keys are then joined against."""
+        if self._own_tx() is not None:
+            return self._find_issues(self.read_colleges(), self.read_programs(), self.read_students())
+        # All three from one version, scanned without holding up writers
+        with self.snapshot() as snap:
+            return self._find_issues(*(snap.tables[n] for n in ("colleges", "programs", "students")))
+
+    def _find_issues(self, colleges, programs, students):
+        issues = []
+        college_codes = self._check_keys("colleges", colleges, _validate_code_format, issues)
+        program_codes = self._check_keys("programs", programs, _validate_code_format, issues)
+        self._check_keys("students", students, _validate_student_id_format, issues)
+        self._check_refs("programs", programs, "college_code", college_codes, issues)
+        self._check_refs("students", students, "program_code", program_codes, issues)
+        return issues
+
+    def repair_integrity(self):
+        """Apply every automatic fix from check_integrity in one transaction.
+        Returns the number of issues repaired."""
+        with self.transaction("Repair data"):
+            issues = [i for i in self.check_integrity() if i.fixable]
+            by_table = {}
+            for issue in issues:
+                by_table.setdefault(issue.table, []).append(issue)
+            for name, table_issues in by_table.items():
+                rows = self._read_table(name)
+                dropped = set()
+                for issue in table_issues:
+                    if issue.fix is IntegrityIssue.DROP_ROW:
+                        dropped.add(issue.row)
+                    else:
+                        rows[issue.row][issue.field] = issue.fix
+                self._write_table(name, [r for i, r in enumerate(rows) if i not in dropped])
+        return len(issues)
+
+    def _check_keys(self, name, rows, valid, issues):
+        key = TABLES[name][2]
+        first_seen = {}
+        for i, r in enumerate(rows):
+            k = r.get(key) or ""
+            if not valid(k):
+                issues.append(IntegrityIssue(name, i, k, f"Invalid {key} format", key))
+            first = first_seen.setdefault(k, i)
+            if first == i:
+                continue
+            if rows[first] == r:
+                issues.append(IntegrityIssue(name, i, k, "Exact duplicate row", key, IntegrityIssue.DROP_ROW))
+            else:
+                issues.append(IntegrityIssue(name, i, k, f"Duplicate {key} with different data", key))
+        return first_seen
+
+    def _check_refs(self, name, rows, field, targets, issues):
+        key = TABLES[name][2]
+        # Tolerate stray whitespace and lower case when suggesting the intended code
+        normalized = {code.strip().upper(): code for code in targets}
+        for i, r in enumerate(rows):
+            value = r.get(field) or ""
+            if _is_null(value):
+                if value != NULL_DISPLAY:
+                    issues.append(IntegrityIssue(name, i, r.get(key), f"Non-standard null '{value}'",
+                                                 field, NULL_DISPLAY))
+            elif value not in targets:
+                fix = normalized.get(value.strip().upper(), NULL_DISPLAY)
+                issues.append(IntegrityIssue(name, i, r.get(key), f"Unknown {field} '{value}'", field, fix))
 
 #  Edit Dialogs
 DIALOG_STYLE = """
@@ -235,6 +2424,105 @@ QPushButton#btnCancelDialog {
 QPushButton#btnCancelDialog:hover { background-color: #cfd8dc; }
 """
 
+# Main-window rules layered over the stylesheet in estudyo_main.ui
+EXTRA_QSS = """
+/* ── Sidebar nav ── */
+QPushButton#navButton, QPushButton#btnManage,
+QPushButton#btnPrograms, QPushButton#btnColleges {
+    background-color: transparent;
+    color: #e8f4fd;
+    border: none;
+    border-left: 4px solid transparent;
+    text-align: left;
+    padding: 14px 20px 14px 20px;
+    font-size: 14px;
+    font-weight: 600;
+    min-width: 220px;
+}
+QPushButton#navButton:hover, QPushButton#btnManage:hover,
+QPushButton#btnPrograms:hover, QPushButton#btnColleges:hover {
+    background-color: rgba(255,255,255,0.12);
+    border-left: 4px solid #64b5f6;
+}
+QPushButton#navButton:checked, QPushButton#btnManage:checked,
+QPushButton#btnPrograms:checked, QPushButton#btnColleges:checked {
+    background-color: rgba(255,255,255,0.18);
+    border-left: 4px solid #42a5f5;
+    color: white;
+}
+
+/* ── Search / Sort (blue) ── */
+QPushButton#btnSearch, QPushButton#btnSort {
+    background-color: #1565C0;
+    color: white;
+    border-radius: 6px;
+    padding: 8px 18px;
+    font-weight: 700;
+}
+QPushButton#btnSearch:hover, QPushButton#btnSort:hover {
+    background-color: #0d47a1;
+}
+
+/* ── Edit (teal-blue) ── */
+QPushButton#btnEdit {
+    background-color: #0288d1;
+    color: white;
+    border-radius: 6px;
+    padding: 8px 18px;
+    font-weight: 700;
+}
+QPushButton#btnEdit:hover { background-color: #01579b; }
+
+/* ── Delete (red) ── */
+QPushButton#btnDelete {
+    background-color: #c62828;
+    color: white;
+    border-radius: 6px;
+    padding: 8px 18px;
+    font-weight: 700;
+}
+QPushButton#btnDelete:hover { background-color: #b71c1c; }
+
+/* ── Add / Save (green-blue) ── */
+QPushButton#btnAdd {
+    background-color: #1976D2;
+    color: white;
+    border-radius: 6px;
+    padding: 8px 20px;
+    font-weight: 700;
+}
+QPushButton#btnAdd:hover { background-color: #1565C0; }
+
+/* ── Clear (grey-blue) ── */
+QPushButton#btnClear {
+    background-color: #546e7a;
+    color: white;
+    border-radius: 6px;
+    padding: 8px 18px;
+    font-weight: 700;
+}
+QPushButton#btnClear:hover { background-color: #37474f; }
+
+/* ── Search/filter row labels ── */
+QFrame#searchFrame QLabel { color: #1a3a5c; font-weight: 600; }
+
+/* ── Header ── */
+QFrame#headerFrame { background-color: #1a3a5c; }
+QLabel#headerTitle { color: #1a3a5c; font-size: 26px; font-weight: bold; padding-left: 16px; }
+
+/* ── Table header ── */
+QHeaderView::section {
+    background-color: #1565C0;
+    color: white;
+    padding: 10px;
+    border: none;
+    border-right: 1px solid #1976D2;
+    font-weight: 700;
+    font-size: 13px;
+}
+QTableWidget::item:selected { background-color: #bbdefb; color: #0d1b2a; }
+"""
+
 def _is_null(val):
     """Check if a value is a null sentinel."""
     return val.strip().upper() in ("-NULL-", "-Null-", "NULL", "")
@@ -265,6 +2553,11 @@ def _validate_student_id_format(sid):
     return bool(re.fullmatch(r"\d{4}-\d{4}", sid))
 
 
+def _validate_code_format(code):
+    """Return True if code is upper-case letters, spaces and parentheses, as entered through the code validator."""
+    return bool(re.fullmatch(r"[A-Z][A-Z ()]*", code)) and code == code.strip()
+
+
 def _apply_code_validator(line_edit):
     """Restrict a QLineEdit to letters, spaces, and parentheses only — auto-uppercased."""
     rx = QRegularExpression(r"^[A-Za-z ()\s]*$")
@@ -285,13 +2578,121 @@ def _apply_name_validator(line_edit):
     line_edit.setValidator(validator)
 
 
+class CodePickerModel(QStandardItemModel):
+    """Shared "CODE - Name" list for the program or college pickers.
+
+    One instance per table is kept in sync by the data layer through apply_diff, and
+    every combo box that picks from that table binds to it with _bind_picker."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = {}   # code -> row
+        self._upper = {}  # CODE -> code, for case-insensitive typing
+
+    @staticmethod
+    def _label(row):
+        return f"{row['code']} - {row['name']}"
+
+    def _make_item(self, row):
+        item = QStandardItem(self._label(row))
+        item.setData(row["code"], Qt.ItemDataRole.UserRole)
+        return item
+
+    def set_rows(self, rows):
+        self.clear()
+        for r in rows:
+            self.appendRow(self._make_item(r))
+        self._reindex()
+
+    def _reindex(self):
+        self._rows = {self.item(i).data(Qt.ItemDataRole.UserRole): i for i in range(self.rowCount())}
+        self._upper = {code.upper(): code for code in self._rows}
+
+    def apply_diff(self, diff):
+        """Update the items touched by a commit (see _diff_rows) in place. Returns False,
+        changing nothing, if the diff names codes this list does not hold as expected;
+        the list is out of date then and has to be filled again with set_rows."""
+        for _, _, old, _, new in diff:
+            if (old is not None and old["code"] not in self._rows) or \
+                    (old is None and new["code"] in self._rows):
+                return False
+        removed = {old_pos: old for _, old_pos, old, _, new in diff if old is not None and new is None}
+        inserted = []
+        for _, old_pos, old, new_pos, new in diff:
+            if new is None:
+                continue
+            if old is not None:
+                self.item(self._rows[old["code"]]).setText(self._label(new))
+            elif new_pos in removed and removed[new_pos]["code"] in self._rows:
+                # A renamed code shows up as delete + insert at the same position
+                item = self.item(self._rows[removed.pop(new_pos)["code"]])
+                item.setText(self._label(new))
+                item.setData(new["code"], Qt.ItemDataRole.UserRole)
+            else:
+                inserted.append((new_pos, new))
+        for row in sorted((self._rows[old["code"]] for old in removed.values() if old["code"] in self._rows),
+                          reverse=True):
+            self.removeRow(row)
+        for pos, new in sorted(inserted, key=lambda item: item[0]):
+            self.insertRow(min(pos, self.rowCount()), self._make_item(new))
+        self._reindex()
+        return True
+
+    def row_of(self, code):
+        """Row holding code (exact, then case-insensitive), or -1."""
+        row = self._rows.get(code)
+        if row is None:
+            row = self._rows.get(self._upper.get(code.upper()), -1)
+        return row
+
+    def code_at(self, row):
+        return self.item(row).data(Qt.ItemDataRole.UserRole)
+
+    def labels(self):
+        return [self.item(i).text() for i in range(self.rowCount())]
+
+
+def _bind_picker(combo, model):
+    """Bind a QComboBox to a shared CodePickerModel with type-ahead "contains" completion."""
+    combo.setModel(model)
+    combo.setEditable(True)
+    combo.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
+    completer = QCompleter(model, combo)
+    completer.setFilterMode(Qt.MatchFlag.MatchContains)
+    completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+    completer.setCompletionMode(QCompleter.CompletionMode.PopupCompletion)
+    combo.setCompleter(completer)
+
+
+def _picker_code(combo, model):
+    """Code chosen in a picker combo, NULL_DISPLAY for a blank or null entry, or None if
+    the text matches no code. The text may be a full "CODE - Name" label or just the code."""
+    text = combo.currentText().strip()
+    if _is_null(text):
+        return NULL_DISPLAY
+    row = model.row_of(text.split(" - ", 1)[0].strip())
+    return model.code_at(row) if row >= 0 else None
+
+
+def _select_picker_code(combo, model, code):
+    """Show code in a picker combo; a null code is shown as NULL_DISPLAY, an unknown one falls back to the first entry."""
+    row = model.row_of(code)
+    if row >= 0:
+        combo.setCurrentIndex(row)
+    elif _is_null(code):
+        combo.setCurrentIndex(-1)
+        combo.setEditText(NULL_DISPLAY)
+    else:
+        combo.setCurrentIndex(0)
+
+
 class EditStudentDialog(QDialog):
-    def __init__(self, parent, student, programs, all_students=None):
+    def __init__(self, parent, student, program_model, all_students=None):
         super().__init__(parent)
         self.setWindowTitle("Edit Student")
         self.setMinimumWidth(480)
         self.setStyleSheet(DIALOG_STYLE)
         self.student = student
+        self.program_model = program_model
         self.all_students = all_students or []
 
         layout = QVBoxLayout(self)
@@ -316,19 +2717,8 @@ class EditStudentDialog(QDialog):
         if idx >= 0: self.comboGender.setCurrentIndex(idx)
 
         self.comboProgram = QComboBox()
-        prog_code = student["program_code"]
-        if _is_null(prog_code):
-            self.comboProgram.addItem(NULL_DISPLAY, NULL_DISPLAY)
-        for p in programs:
-            self.comboProgram.addItem(f"{p['code']} - {p['name']}", p["code"])
-        matched = False
-        for i in range(self.comboProgram.count()):
-            if self.comboProgram.itemData(i) == prog_code:
-                self.comboProgram.setCurrentIndex(i)
-                matched = True
-                break
-        if not matched:
-            self.comboProgram.setCurrentIndex(0)
+        _bind_picker(self.comboProgram, program_model)
+        _select_picker_code(self.comboProgram, program_model, student["program_code"])
 
         self.comboYear = QComboBox()
         self.comboYear.addItems(["1", "2", "3", "4"])
@@ -370,6 +2760,10 @@ class EditStudentDialog(QDialog):
                                 "Student ID must be in the format XXXX-XXXX (digits only, e.g. 2024-0001).")
             return
 
+        if _picker_code(self.comboProgram, self.program_model) is None:
+            QMessageBox.warning(self, "Invalid Program", "Please choose a program from the list.")
+            return
+
         old_id = self.student["id"]
         if sid != old_id:
             if any(s["id"] == sid for s in self.all_students):
@@ -386,7 +2780,7 @@ class EditStudentDialog(QDialog):
             "first_name": self.lineFirst.text().strip(),
             "last_name": self.lineLast.text().strip(),
             "gender": self.comboGender.currentText(),
-            "program_code": self.comboProgram.currentData(),
+            "program_code": _picker_code(self.comboProgram, self.program_model),
             "year_level": self.comboYear.currentText(),
         }
 
@@ -431,7 +2825,7 @@ class EditCollegeDialog(QDialog):
 
 
 class EditProgramDialog(QDialog):
-    def __init__(self, parent, program, colleges):
+    def __init__(self, parent, program, college_model):
         super().__init__(parent)
         self.setWindowTitle("Edit Program")
         self.setMinimumWidth(480)
@@ -450,21 +2844,10 @@ class EditProgramDialog(QDialog):
         _apply_code_validator(self.lineCode)
         self.lineName = QLineEdit(program["name"])
         _apply_name_validator(self.lineName)
+        self.college_model = college_model
         self.comboCollege = QComboBox()
-
-        coll_code = program["college_code"]
-        if _is_null(coll_code):
-            self.comboCollege.addItem(NULL_DISPLAY, NULL_DISPLAY)
-        for c in colleges:
-            self.comboCollege.addItem(f"{c['code']} - {c['name']}", c["code"])
-        matched = False
-        for i in range(self.comboCollege.count()):
-            if self.comboCollege.itemData(i) == coll_code:
-                self.comboCollege.setCurrentIndex(i)
-                matched = True
-                break
-        if not matched:
-            self.comboCollege.setCurrentIndex(0)
+        _bind_picker(self.comboCollege, college_model)
+        _select_picker_code(self.comboCollege, college_model, program["college_code"])
 
         form.addRow("Program Code:", self.lineCode)
         form.addRow("Program Name:", self.lineName)
@@ -481,33 +2864,281 @@ class EditProgramDialog(QDialog):
         btnRow.addWidget(btnSave)
         layout.addLayout(btnRow)
 
-        btnSave.clicked.connect(self.accept)
+        btnSave.clicked.connect(self._on_save)
         btnCancel.clicked.connect(self.reject)
 
+    def _on_save(self):
+        if _picker_code(self.comboCollege, self.college_model) is None:
+            QMessageBox.warning(self, "Invalid College", "Please choose a college from the list.")
+            return
+        self.accept()
+
     def get_data(self):
         return {
             "code": self.lineCode.text().strip(),
             "name": self.lineName.text().strip(),
-            "college_code": self.comboCollege.currentData(),
+            "college_code": _picker_code(self.comboCollege, self.college_model),
         }
 
 
+class IntegrityReportDialog(QDialog):
+    """Lists the issues from CSVManager.check_integrity; accepting it means "repair"."""
+    def __init__(self, parent, issues):
+        super().__init__(parent)
+        self.setWindowTitle("Data Check")
+        self.setMinimumSize(720, 420)
+        self.setStyleSheet(DIALOG_STYLE)
+
+        layout = QVBoxLayout(self)
+        layout.setSpacing(16)
+        layout.setContentsMargins(20, 20, 20, 20)
+
+        fixable = sum(1 for i in issues if i.fixable)
+        summary = QLabel(f"{len(issues)} issue(s) found, {fixable} can be repaired automatically."
+                         if issues else "No problems found. All keys and references are valid.")
+        layout.addWidget(summary)
+
+        table = QTableWidget(len(issues), 4)
+        table.setHorizontalHeaderLabels(["Table", "Record", "Problem", "Fix"])
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
+        for r, issue in enumerate(issues):
+            for c, val in enumerate([issue.table, issue.key or "", issue.problem, issue.describe_fix()]):
+                table.setItem(r, c, QTableWidgetItem(val))
+        layout.addWidget(table)
+
+        btnRow = QHBoxLayout()
+        btnRow.addStretch()
+        btnRepair = QPushButton(f"Repair {fixable} Issue(s)")
+        btnRepair.setObjectName("btnSaveDialog")
+        btnRepair.setEnabled(fixable > 0)
+        btnClose = QPushButton("Close")
+        btnClose.setObjectName("btnCancelDialog")
+        btnRow.addWidget(btnClose)
+        btnRow.addWidget(btnRepair)
+        layout.addLayout(btnRow)
+
+        btnRepair.clicked.connect(self.accept)
+        btnClose.clicked.connect(self.reject)
+
+
+#  Cached UI assets (built by build_assets.py)
+UI_FILE = "estudyo_main.ui"
+ASSET_CACHE_DIR = "build"
+ASSET_MANIFEST = os.path.join(ASSET_CACHE_DIR, "manifest.json")
+LOGO_PATHS = ["icons/estudyo_logo.svg", "estudyo_logo.svg", "icons/estudyo_logo.png", "estudyo_logo.png"]
+LOGO_SIZE = 48
+NAV_ICON_PATHS = {
+    "btnManage":   ["student.svg",  "icons/student.svg"],
+    "btnPrograms": ["program.svg",  "icons/program.svg"],
+    "btnColleges": ["college.svg",  "icons/college.svg"],
+}
+NAV_ICON_SIZE = 20
+
+
+def _first_existing(paths):
+    return next((p for p in paths if os.path.exists(p)), None)
+
+
+def asset_sources():
+    """Fingerprints of everything the asset cache is built from; a cache is stale when these differ."""
+    sources = {"extra_qss": hashlib.sha1(EXTRA_QSS.encode("utf-8")).hexdigest()}
+    for path in [UI_FILE, _first_existing(LOGO_PATHS)] + [_first_existing(p) for p in NAV_ICON_PATHS.values()]:
+        if path is not None:
+            with open(path, "rb") as f:
+                sources[path] = hashlib.sha1(f.read()).hexdigest()
+    return sources
+
+
+def load_asset_manifest():
+    """Return the asset manifest if the cache exists and matches the current sources, else None."""
+    try:
+        with open(ASSET_MANIFEST, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("sources") != asset_sources():
+        return None
+    paths = [manifest["ui_module"], manifest["logo"]] + [p for sizes in manifest["icons"].values() for p in sizes.values()]
+    if not all(p is None or os.path.exists(p) for p in paths):
+        return None
+    return manifest
+
+
+class StartupTimer:
+    """Collects the duration of each startup phase."""
+    def __init__(self):
+        self.start = self.last = time.perf_counter()
+        self.phases = []
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, (now - self.last) * 1000))
+        self.last = now
+
+    def total_ms(self):
+        return (self.last - self.start) * 1000
+
+    def report(self):
+        return ", ".join(f"{name} {ms:.1f} ms" for name, ms in self.phases) + f" (total {self.total_ms():.1f} ms)"
+
+
+#  Background I/O
+class DataEvents(QObject):
+    """Carries CSVManager commit notifications from the I/O thread to the GUI thread."""
+    committed = pyqtSignal(object)
+    reloaded = pyqtSignal(object)
+
+
+class IOExecutor(QObject):
+    """Runs data-layer calls on one background thread, in the order they were submitted.
+
+    Results come back on the GUI thread through on_done/on_error. Jobs submitted with a
+    key are coalesced: while one with the same key is still queued, new ones are dropped."""
+    busyChanged = pyqtSignal()
+    failed = pyqtSignal(object)
+    _jobDone = pyqtSignal(object, object, object)  # callback, result, error
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="estudyo-io")
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queued_keys = set()
+        self._jobDone.connect(self._deliver)
+
+    def is_busy(self):
+        return self._active > 0
+
+    def submit(self, fn, on_done=None, on_error=None, key=None):
+        """Queue fn() on the I/O thread. Safe to call from any thread."""
+        with self._lock:
+            if key is not None:
+                if key in self._queued_keys:
+                    return
+                self._queued_keys.add(key)
+            self._active += 1
+            started = self._active == 1
+
+        def _job():
+            if key is not None:
+                with self._lock:
+                    self._queued_keys.discard(key)
+            try:
+                result = fn()
+            except Exception as e:
+                self._jobDone.emit(on_error, None, e)
+            else:
+                self._jobDone.emit(on_done, result, None)
+
+        self._pool.submit(_job)
+        if started:
+            self.busyChanged.emit()
+
+    def _deliver(self, callback, result, error):
+        with self._lock:
+            self._active -= 1
+            idle = self._active == 0
+        try:
+            if error is not None:
+                if callback is not None:
+                    callback(error)
+                else:
+                    self.failed.emit(error)
+            elif callback is not None:
+                callback(result)
+        finally:
+            if idle:
+                self.busyChanged.emit()
+
+    def shutdown(self):
+        """Wait for every queued job to finish and stop the thread."""
+        self._pool.shutdown(wait=True)
+
+
 #  Main Application
 class EstudyoApp(QtWidgets.QMainWindow):
     def __init__(self):
         super().__init__()
-        self.csv = CSVManager()
-        uic.loadUi("estudyo_main.ui", self)
+        self.startup = StartupTimer()
+        self.csv = CSVManager(flush_interval_ms=FLUSH_INTERVAL_MS, flush_max_ops=FLUSH_MAX_OPS)
+        self.io = IOExecutor(self)
+        # Long read-only reports run on their own thread over a pinned snapshot, so data
+        # entry on the I/O thread carries on meanwhile
+        self.reports = IOExecutor(self)
+        self.csv.flush_scheduler = lambda: self.io.submit(self.csv.flush, key="flush")
+        self.dataEvents = DataEvents(self)
+        self.csv.add_listener(self.dataEvents.committed.emit)
+        self.csv.add_reload_listener(self.dataEvents.reloaded.emit)
+        self.programPicker = CodePickerModel(self)
+        self.collegePicker = CodePickerModel(self)
+        self.startup.mark("data layer")
+
+        self._assets = load_asset_manifest()
+        self._load_ui()
         self.setWindowIcon(QIcon("icons/estudyo_logo.svg"))
+        self.startup.mark("ui (compiled)" if self._assets else "ui (.ui parse)")
 
         self._current_students = None
         self._current_programs = None
         self._current_colleges = None
 
         self.setup_ui()
+        self.startup.mark("widgets, icons, styles")
         self.setup_connections()
         self.load_initial_data()
         self.show()
+        self.startup.mark("show")
+        self.statusBar().showMessage(f"Started in {self.startup.total_ms():.0f} ms", 5000)
+        if os.environ.get("ESTUDYO_PROFILE_STARTUP"):
+            print("startup:", self.startup.report(), file=sys.stderr)
+
+    def _load_ui(self):
+        """Use the precompiled UI module when the asset cache is fresh, else parse the .ui file."""
+        if self._assets is not None:
+            try:
+                spec = importlib.util.spec_from_file_location("estudyo_main_ui", self._assets["ui_module"])
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                ui = module.Ui_MainWindow()
+                ui.setupUi(self)
+                # uic.loadUi exposes widgets as attributes of the window; do the same
+                self.__dict__.update(vars(ui))
+                return
+            except Exception as e:
+                print(f"Ignoring asset cache ({e}); loading {UI_FILE}", file=sys.stderr)
+                self._assets = None
+        uic.loadUi(UI_FILE, self)
+
+    def closeEvent(self, event):
+        self.reports.shutdown()
+        self.io.shutdown()
+        self.csv.flush()
+        if os.environ.get("ESTUDYO_PROFILE_CACHE"):
+            print("result cache:", self.csv.results.stats(), file=sys.stderr)
+        super().closeEvent(event)
+
+    def _run_io(self, fn, on_done=None, on_error=None):
+        """Run a CSVManager call on the I/O thread; ValueErrors are shown as warnings."""
+        def _default_error(e):
+            self._show_io_error(e)
+        self.io.submit(fn, on_done, on_error or _default_error)
+
+    def _show_io_error(self, e):
+        if isinstance(e, ValueError):
+            QMessageBox.warning(self, "Error", str(e))
+        else:
+            QMessageBox.critical(self, "I/O Error", f"Could not access the data files:\n{e}")
+
+    def _on_io_busy_changed(self):
+        busy = self.io.is_busy() or self.reports.is_busy()
+        self.busyIndicator.setVisible(busy)
+        if busy:
+            QApplication.setOverrideCursor(Qt.CursorShape.BusyCursor)
+        else:
+            while QApplication.overrideCursor() is not None:
+                QApplication.restoreOverrideCursor()
 
     def _white_icon(self, path):
         pixmap = QPixmap(path)
@@ -521,6 +3152,14 @@ class EstudyoApp(QtWidgets.QMainWindow):
         self.setup_table_properties(self.tableStudents)
         self.setup_table_properties(self.tablePrograms)
         self.setup_table_properties(self.tableColleges)
+        # Students support multi-row selection for the batch actions
+        self.tableStudents.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        # Optional joined columns after the six student fields, hidden until asked for
+        base = self.tableStudents.columnCount()
+        self.tableStudents.setColumnCount(base + len(JOINED_STUDENT_COLUMNS))
+        for i, (_, title) in enumerate(JOINED_STUDENT_COLUMNS):
+            self.tableStudents.setHorizontalHeaderItem(base + i, QTableWidgetItem(title))
+            self.tableStudents.setColumnHidden(base + i, True)
         self.stackedWidget.setCurrentIndex(0)
         self.populate_combo_boxes()
 
@@ -531,129 +3170,48 @@ class EstudyoApp(QtWidgets.QMainWindow):
         _apply_name_validator(self.lineFirstName)
         _apply_name_validator(self.lineLastName)
 
-        # Logo/Icons
-        for path in ["icons/estudyo_logo.svg", "estudyo_logo.svg", "icons/estudyo_logo.png", "estudyo_logo.png"]:
-            if os.path.exists(path):
+        # Logo/Icons: pre-rendered by build_assets.py when the cache is fresh
+        if self._assets is not None and self._assets["logo"]:
+            self.logoLabel.setPixmap(QPixmap(self._assets["logo"]))
+            self.logoLabel.setScaledContents(False)
+        else:
+            path = _first_existing(LOGO_PATHS)
+            if path is not None:
                 pixmap = QPixmap(path)
                 self.logoLabel.setPixmap(
-                    pixmap.scaled(48, 48, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+                    pixmap.scaled(LOGO_SIZE, LOGO_SIZE, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
                 )
                 self.logoLabel.setScaledContents(False)
-                break
 
-        icon_map = {
-            self.btnManage:   ["student.svg",  "icons/student.svg"],
-            self.btnPrograms: ["program.svg",  "icons/program.svg"],
-            self.btnColleges: ["college.svg",  "icons/college.svg"],
-        }
-        for btn, paths in icon_map.items():
-            for path in paths:
-                if os.path.exists(path):
-                    btn.setIcon(self._white_icon(path))
-                    btn.setIconSize(QSize(20, 20))
-                    break
+        for name, paths in NAV_ICON_PATHS.items():
+            btn = getattr(self, name)
+            rendered = self._assets["icons"].get(name) if self._assets is not None else None
+            if rendered:
+                icon = QIcon()
+                for path in rendered.values():
+                    icon.addFile(path)
+            else:
+                path = _first_existing(paths)
+                if path is None:
+                    continue
+                icon = self._white_icon(path)
+            btn.setIcon(icon)
+            btn.setIconSize(QSize(NAV_ICON_SIZE, NAV_ICON_SIZE))
+
+        # Busy indicator shown while the I/O thread has work queued
+        self.busyIndicator = QProgressBar()
+        self.busyIndicator.setRange(0, 0)
+        self.busyIndicator.setMaximumWidth(140)
+        self.busyIndicator.setTextVisible(False)
+        self.busyIndicator.setVisible(False)
+        self.statusBar().addPermanentWidget(self.busyIndicator)
 
         self._apply_extra_styles()
 
     def _apply_extra_styles(self):
-        extra_qss = """
-        /* ── Sidebar nav ── */
-        QPushButton#navButton, QPushButton#btnManage,
-        QPushButton#btnPrograms, QPushButton#btnColleges {
-            background-color: transparent;
-            color: #e8f4fd;
-            border: none;
-            border-left: 4px solid transparent;
-            text-align: left;
-            padding: 14px 20px 14px 20px;
-            font-size: 14px;
-            font-weight: 600;
-            min-width: 220px;
-        }
-        QPushButton#navButton:hover, QPushButton#btnManage:hover,
-        QPushButton#btnPrograms:hover, QPushButton#btnColleges:hover {
-            background-color: rgba(255,255,255,0.12);
-            border-left: 4px solid #64b5f6;
-        }
-        QPushButton#navButton:checked, QPushButton#btnManage:checked,
-        QPushButton#btnPrograms:checked, QPushButton#btnColleges:checked {
-            background-color: rgba(255,255,255,0.18);
-            border-left: 4px solid #42a5f5;
-            color: white;
-        }
-
-        /* ── Search / Sort (blue) ── */
-        QPushButton#btnSearch, QPushButton#btnSort {
-            background-color: #1565C0;
-            color: white;
-            border-radius: 6px;
-            padding: 8px 18px;
-            font-weight: 700;
-        }
-        QPushButton#btnSearch:hover, QPushButton#btnSort:hover {
-            background-color: #0d47a1;
-        }
-
-        /* ── Edit (teal-blue) ── */
-        QPushButton#btnEdit {
-            background-color: #0288d1;
-            color: white;
-            border-radius: 6px;
-            padding: 8px 18px;
-            font-weight: 700;
-        }
-        QPushButton#btnEdit:hover { background-color: #01579b; }
-
-        /* ── Delete (red) ── */
-        QPushButton#btnDelete {
-            background-color: #c62828;
-            color: white;
-            border-radius: 6px;
-            padding: 8px 18px;
-            font-weight: 700;
-        }
-        QPushButton#btnDelete:hover { background-color: #b71c1c; }
-
-        /* ── Add / Save (green-blue) ── */
-        QPushButton#btnAdd {
-            background-color: #1976D2;
-            color: white;
-            border-radius: 6px;
-            padding: 8px 20px;
-            font-weight: 700;
-        }
-        QPushButton#btnAdd:hover { background-color: #1565C0; }
-
-        /* ── Clear (grey-blue) ── */
-        QPushButton#btnClear {
-            background-color: #546e7a;
-            color: white;
-            border-radius: 6px;
-            padding: 8px 18px;
-            font-weight: 700;
-        }
-        QPushButton#btnClear:hover { background-color: #37474f; }
-
-        /* ── Search/filter row labels ── */
-        QFrame#searchFrame QLabel { color: #1a3a5c; font-weight: 600; }
-
-        /* ── Header ── */
-        QFrame#headerFrame { background-color: #1a3a5c; }
-        QLabel#headerTitle { color: #1a3a5c; font-size: 26px; font-weight: bold; padding-left: 16px; }
-
-        /* ── Table header ── */
-        QHeaderView::section {
-            background-color: #1565C0;
-            color: white;
-            padding: 10px;
-            border: none;
-            border-right: 1px solid #1976D2;
-            font-weight: 700;
-            font-size: 13px;
-        }
-        QTableWidget::item:selected { background-color: #bbdefb; color: #0d1b2a; }
-        """
-        self.setStyleSheet(self.styleSheet() + extra_qss)
+        if self._assets is not None and self._assets.get("styles_baked"):
+            return
+        self.setStyleSheet(self.styleSheet() + EXTRA_QSS)
 
     def setup_table_properties(self, table):
         table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
@@ -664,17 +3222,41 @@ class EstudyoApp(QtWidgets.QMainWindow):
         table.setAlternatingRowColors(True)
 
     def populate_combo_boxes(self):
-        programs = self.csv.read_programs()
-        self.comboProgramCode.clear()
-        for p in programs:
-            self.comboProgramCode.addItem(f"{p['code']} - {p['name']}", p["code"])
+        """Bind the form pickers to the shared models and fill them once; commits keep them current."""
+        _bind_picker(self.comboProgramCode, self.programPicker)
+        _bind_picker(self.comboCollegeCode, self.collegePicker)
+        self._run_io(lambda: (self.csv.read_programs(), self.csv.read_colleges()), self._fill_pickers)
+
+    def _fill_pickers(self, tables):
+        programs, colleges = tables
+        self.programPicker.set_rows(programs)
+        self.collegePicker.set_rows(colleges)
+        self.comboProgramCode.setCurrentIndex(0)
+        self.comboCollegeCode.setCurrentIndex(0)
 
-        colleges = self.csv.read_colleges()
-        self.comboCollegeCode.clear()
-        for c in colleges:
-            self.comboCollegeCode.addItem(f"{c['code']} - {c['name']}", c["code"])
+    def _on_data_committed(self, changes):
+        if "programs" in changes and not self.programPicker.apply_diff(changes["programs"]):
+            self._refill_pickers(["programs"])
+        if "colleges" in changes and not self.collegePicker.apply_diff(changes["colleges"]):
+            self._refill_pickers(["colleges"])
+        if ("programs" in changes or "colleges" in changes) and self.chkShowJoined.isChecked():
+            # Renamed programs or colleges show up in the joined columns
+            self._refresh_students_view()
+
+    def _refill_pickers(self, names):
+        """Fill the pickers of the named tables again from a fresh read."""
+        if "programs" in names:
+            self._run_io(self.csv.read_programs, self.programPicker.set_rows)
+        if "colleges" in names:
+            self._run_io(self.csv.read_colleges, self.collegePicker.set_rows)
 
     def setup_connections(self):
+        self.io.busyChanged.connect(self._on_io_busy_changed)
+        self.io.failed.connect(self._show_io_error)
+        self.reports.busyChanged.connect(self._on_io_busy_changed)
+        self.dataEvents.committed.connect(self._on_data_committed)
+        self.dataEvents.reloaded.connect(self._refill_pickers)
+
         self.navButton.clicked.connect(lambda: self.switch_page(0, "Dashboard"))
         self.btnManage.clicked.connect(lambda: self.switch_page(1, "Students"))
         self.btnPrograms.clicked.connect(lambda: self.switch_page(2, "Programs"))
@@ -682,8 +3264,13 @@ class EstudyoApp(QtWidgets.QMainWindow):
 
         self.btnSearch.clicked.connect(self.search_students)
         self.btnSort.clicked.connect(self.sort_students)
+        self.btnFilter.clicked.connect(self.search_students)
+        self.chkShowJoined.toggled.connect(self.toggle_joined_columns)
+        self.lineFilterQuery.returnPressed.connect(self.search_students)
         self.btnEdit.clicked.connect(self.edit_student_from_dashboard)
         self.btnDelete.clicked.connect(self.delete_student_from_dashboard)
+        self.btnReassignProgram.clicked.connect(self.reassign_students_program)
+        self.btnPromote.clicked.connect(self.promote_students)
 
         self.btnAddStudent.clicked.connect(self.add_student)
         self.btnClearStudent.clicked.connect(self.clear_student_form)
@@ -702,6 +3289,11 @@ class EstudyoApp(QtWidgets.QMainWindow):
         self.btnSortProgram.clicked.connect(self.sort_programs_table)
         self.btnSearchCollege.clicked.connect(self.search_colleges_table)
         self.btnSortCollege.clicked.connect(self.sort_colleges_table)
+        self.btnCheckData.clicked.connect(self.check_data)
+
+        QShortcut(QKeySequence.StandardKey.Undo, self, activated=self.undo)
+        QShortcut(QKeySequence.StandardKey.Redo, self, activated=self.redo)
+        QShortcut(QKeySequence.StandardKey.Save, self, activated=self.save_changes)
 
     #  Navigation
     def switch_page(self, index, title):
@@ -718,6 +3310,41 @@ class EstudyoApp(QtWidgets.QMainWindow):
             self._current_colleges = None
             self.load_colleges()
 
+    def save_changes(self):
+        """Write any buffered changes to disk now instead of waiting for the flush interval."""
+        self._run_io(self.csv.flush, lambda _: self.statusBar().showMessage("All changes saved.", 3000))
+
+    def check_data(self):
+        self.reports.submit(self.csv.check_integrity, self._show_integrity_report, self._show_io_error)
+
+    def _show_integrity_report(self, issues):
+        dialog = IntegrityReportDialog(self, issues)
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            def _done(repaired):
+                QMessageBox.information(self, " Success", f"{repaired} issue(s) repaired.")
+                self._refresh_students_view()
+                self._refresh_programs_view()
+                self._refresh_colleges_view()
+            self._run_io(self.csv.repair_integrity, _done)
+
+    #  Undo / redo
+    def undo(self):
+        self._run_history(self.csv.undo, "Undid", "Nothing to undo.")
+
+    def redo(self):
+        self._run_history(self.csv.redo, "Redid", "Nothing to redo.")
+
+    def _run_history(self, action, verb, empty_msg):
+        def _done(label):
+            if label is None:
+                self.statusBar().showMessage(empty_msg, 3000)
+                return
+            self.statusBar().showMessage(f"{verb}: {label}", 5000)
+            self._refresh_students_view()
+            self._refresh_programs_view()
+            self._refresh_colleges_view()
+        self._run_io(action, _done)
+
     def load_initial_data(self):
         self.load_colleges()
         self.load_programs()
@@ -745,17 +3372,33 @@ class EstudyoApp(QtWidgets.QMainWindow):
     #  Data loaders
     def load_students(self, students=None):
         if students is None:
-            students = self.csv.read_students()
+            self._run_io(self.csv.read_students, self.load_students)
+            return
+        joined = self.chkShowJoined.isChecked()
+        if joined and students and "program_name" not in students[0]:
+            self._run_io(lambda: self.csv.join_students(students), self.load_students)
+            return
         self._current_students = students
         self.tableStudents.setRowCount(0)
         for r, s in enumerate(students):
             self.tableStudents.insertRow(r)
-            for c, val in enumerate([s["id"], s["first_name"], s["last_name"], s["program_code"], s["year_level"], s["gender"]]):
+            values = [s["id"], s["first_name"], s["last_name"], s["program_code"], s["year_level"], s["gender"]]
+            if joined:
+                values += [s[field] for field, _ in JOINED_STUDENT_COLUMNS]
+            for c, val in enumerate(values):
                 self.tableStudents.setItem(r, c, self._make_item(val))
 
+    def toggle_joined_columns(self, checked):
+        base = self.tableStudents.columnCount() - len(JOINED_STUDENT_COLUMNS)
+        for i in range(len(JOINED_STUDENT_COLUMNS)):
+            self.tableStudents.setColumnHidden(base + i, not checked)
+        if self._current_students is not None:
+            self.load_students(self._current_students)
+
     def load_programs(self, programs=None):
         if programs is None:
-            programs = self.csv.read_programs()
+            self._run_io(self.csv.read_programs, self.load_programs)
+            return
         self._current_programs = programs
         self.tablePrograms.setRowCount(0)
         for r, p in enumerate(programs):
@@ -765,7 +3408,8 @@ class EstudyoApp(QtWidgets.QMainWindow):
 
     def load_colleges(self, colleges=None):
         if colleges is None:
-            colleges = self.csv.read_colleges()
+            self._run_io(self.csv.read_colleges, self.load_colleges)
+            return
         self._current_colleges = colleges
         self.tableColleges.setRowCount(0)
         for r, col in enumerate(colleges):
@@ -774,22 +3418,47 @@ class EstudyoApp(QtWidgets.QMainWindow):
                 self.tableColleges.setItem(r, c, self._make_item(val))
 
     #  Dashboard / Students
-    def search_students(self):
+    def _student_query(self, value):
+        """The search to run for the current "Search by" choice and filter bar, or None to
+        show everyone. Raises ValueError if the filter cannot be parsed."""
         field_map = {
             "Student ID": "id",
             "First Name": "first_name",
             "Last Name": "last_name",
             "Program": "program_code",
         }
-        field = field_map.get(self.comboSearchField.currentText(), "id")
+        conditions = parse_query(self.lineFilterQuery.text())
+        if self.comboSearchField.currentText() == "Name (fuzzy)" and value:
+            if not conditions:
+                return lambda: self.csv.fuzzy_search("students", value)
+            def _fuzzy_filtered():
+                keep = {s["id"] for s in self.csv.query("students", conditions)}
+                return [s for s in self.csv.fuzzy_search("students", value) if s["id"] in keep]
+            return _fuzzy_filtered
+        if value:
+            conditions.append((field_map.get(self.comboSearchField.currentText(), "id"), "contains", value))
+        if not conditions:
+            return None
+        if conditions == [("id", "contains", value)]:
+            # Plain ID search: lets a sharded student table skip other years' files
+            return lambda: self.csv.search_students("id", value)
+        return lambda: self.csv.query("students", conditions)
+
+    def search_students(self):
         value = self.lineSearchInput.text().strip()
-        if not value:
+        try:
+            query = self._student_query(value)
+        except ValueError as e:
+            QMessageBox.warning(self, "Filter Error", str(e))
+            return
+        if query is None:
             self.load_students()
             return
-        results = self.csv.search_students(field, value)
-        self.load_students(results)
-        if not results:
-            QMessageBox.information(self, "No Results", "No students found matching your search.")
+        def _done(results):
+            self.load_students(results)
+            if not results:
+                QMessageBox.information(self, "No Results", "No students found matching your search.")
+        self._run_io(query, _done)
 
     def sort_students(self):
         field_map = {
@@ -801,27 +3470,36 @@ class EstudyoApp(QtWidgets.QMainWindow):
             "Gender": "gender"
         }
         field = field_map.get(self.comboSortField.currentText(), "id")
-        base = self._current_students if self._current_students is not None else self.csv.read_students()
-        sorted_data = sorted(base, key=lambda s: s.get(field, "").lower())
+        if self._current_students is None or not (self.lineSearchInput.text().strip() or
+                                                  self.lineFilterQuery.text().strip()):
+            # Whole table: sorted (and cached) by the data layer, off the GUI thread
+            self._run_io(lambda: self.csv.sort_students(field), self.load_students)
+            return
+        sorted_data = sorted(self._current_students, key=lambda s: s.get(field, "").lower())
         self.load_students(sorted_data)
 
     def _refresh_students_view(self):
         """Re-apply current search filter then reload — used after edit/delete."""
-        field_map = {
-            "Student ID": "id",
-            "First Name": "first_name",
-            "Last Name": "last_name",
-            "Program": "program_code",
-        }
-        value = self.lineSearchInput.text().strip()
-        if value:
-            field = field_map.get(self.comboSearchField.currentText(), "id")
-            results = self.csv.search_students(field, value)
+        try:
+            query = self._student_query(self.lineSearchInput.text().strip())
+        except ValueError:
+            query = None
+        if query is not None:
+            self._run_io(query, self.load_students)
         else:
-            results = self.csv.read_students()
-        self.load_students(results)
+            self.load_students()
+
+    def _selected_student_ids(self):
+        """Return the ids of all selected student rows, in table order."""
+        rows = sorted(idx.row() for idx in self.tableStudents.selectionModel().selectedRows())
+        return [self.tableStudents.item(r, 0).text() for r in rows]
 
     def edit_student_from_dashboard(self):
+        if len(self._selected_student_ids()) > 1:
+            QMessageBox.warning(self, "Multiple Selection",
+                                "Please select a single student to edit.\n"
+                                "Use Reassign Program or Promote Year Level for several students.")
+            return
         selected = self.tableStudents.currentRow()
         if selected < 0:
             QMessageBox.warning(self, "No Selection", "Please select a student to edit.")
@@ -841,40 +3519,78 @@ class EstudyoApp(QtWidgets.QMainWindow):
             "id": sid, "first_name": first_name, "last_name": last_name,
             "gender": gender, "program_code": program_code, "year_level": year_level
         }
-        programs = self.csv.read_programs()
-        all_students = self.csv.read_students()
-        dialog = EditStudentDialog(self, student, programs, all_students)
+        self._run_io(self.csv.read_students,
+                     lambda all_students: self._open_edit_student_dialog(sid, student, all_students))
+
+    def _open_edit_student_dialog(self, sid, student, all_students):
+        dialog = EditStudentDialog(self, student, self.programPicker, all_students)
 
         if dialog.exec() == QDialog.DialogCode.Accepted:
             data = dialog.get_data()
             if not all([data["id"], data["first_name"], data["last_name"]]):
                 QMessageBox.warning(self, "Input Error", "Please fill in all input fields.")
                 return
-            try:
-                self.csv.edit_student(
-                    sid, data["id"], data["first_name"], data["last_name"],
-                    data["gender"], data["program_code"], data["year_level"]
-                )
+
+            def _done(_):
                 QMessageBox.information(self, " Success", "Student updated successfully!")
                 self._refresh_students_view()
-            except ValueError as e:
-                QMessageBox.warning(self, "Error", str(e))
+            self._run_io(lambda: self.csv.edit_student(
+                sid, data["id"], data["first_name"], data["last_name"],
+                data["gender"], data["program_code"], data["year_level"]
+            ), _done)
 
     def delete_student_from_dashboard(self):
-        selected = self.tableStudents.currentRow()
-        if selected < 0:
+        sids = self._selected_student_ids()
+        if not sids:
             QMessageBox.warning(self, "No Selection", "Please select a student to delete.")
             return
-        sid = self.tableStudents.item(selected, 0).text()
+        target = f"student {sids[0]}" if len(sids) == 1 else f"{len(sids)} students"
         reply = QMessageBox.question(
             self, "Confirm Delete",
-            f"Are you sure you want to delete student {sid}?\nThis action cannot be undone.",
+            f"Are you sure you want to delete {target}?\nYou can undo this with Ctrl+Z.",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
         if reply == QMessageBox.StandardButton.Yes:
-            self.csv.delete_student(sid)
-            QMessageBox.information(self, " Deleted", "Student deleted successfully!")
+            def _done(removed):
+                msg = "Student deleted successfully!" if removed == 1 else f"{removed} students deleted successfully!"
+                QMessageBox.information(self, " Deleted", msg)
+                self._refresh_students_view()
+            self._run_io(lambda: self.csv.delete_students(sids), _done)
+
+    def reassign_students_program(self):
+        sids = self._selected_student_ids()
+        if not sids:
+            QMessageBox.warning(self, "No Selection", "Please select the students to reassign.")
+            return
+        labels = self.programPicker.labels()
+        if not labels:
+            QMessageBox.warning(self, "No Programs", "There are no programs to assign.")
+            return
+        label, ok = QInputDialog.getItem(
+            self, "Reassign Program", f"New program for {len(sids)} selected student(s):", labels, 0, False
+        )
+        if not ok:
+            return
+        program_code = self.programPicker.code_at(labels.index(label))
+
+        def _done(changed):
+            QMessageBox.information(self, " Success", f"{changed} student(s) moved to {program_code}.")
             self._refresh_students_view()
+        self._run_io(lambda: self.csv.reassign_students_program(sids, program_code), _done)
+
+    def promote_students(self):
+        sids = self._selected_student_ids()
+        target = f"the {len(sids)} selected student(s)" if sids else "ALL students"
+        reply = QMessageBox.question(
+            self, "Confirm Promotion",
+            f"Promote {target} to the next year level?\nStudents already in year 4 are left unchanged.",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply == QMessageBox.StandardButton.Yes:
+            def _done(promoted):
+                QMessageBox.information(self, " Success", f"{promoted} student(s) promoted.")
+                self._refresh_students_view()
+            self._run_io(lambda: self.csv.promote_students(sids or None), _done)
 
     #  Manage Students
     def add_student(self):
@@ -882,7 +3598,9 @@ class EstudyoApp(QtWidgets.QMainWindow):
         first_name   = self.lineFirstName.text().strip()
         last_name    = self.lineLastName.text().strip()
         gender       = self.comboGender.currentText()
-        program_code = self.comboProgramCode.currentData()
+        program_code = _picker_code(self.comboProgramCode, self.programPicker)
+        if program_code == NULL_DISPLAY:
+            program_code = None
         year_level   = self.comboYearLevel.currentText()
 
         if not all([sid, first_name, last_name, gender, program_code]):
@@ -894,13 +3612,11 @@ class EstudyoApp(QtWidgets.QMainWindow):
                                 "Student ID must be in the format XXXX-XXXX (digits only, e.g. 2024-0001).")
             return
 
-        try:
-            self.csv.add_student(sid, first_name, last_name, gender, program_code, year_level)
+        def _done(_):
             QMessageBox.information(self, " Success", "Student added successfully!")
             self.clear_student_form()
             self.load_students()
-        except ValueError as e:
-            QMessageBox.warning(self, "Error", str(e))
+        self._run_io(lambda: self.csv.add_student(sid, first_name, last_name, gender, program_code, year_level), _done)
 
     def clear_student_form(self):
         self.lineStudentId.clear()
@@ -914,18 +3630,17 @@ class EstudyoApp(QtWidgets.QMainWindow):
     def add_program(self):
         code         = self.lineProgramCode.text().strip().upper()
         name         = self.lineProgramName.text().strip()
-        college_code = self.comboCollegeCode.currentData()
+        college_code = _picker_code(self.comboCollegeCode, self.collegePicker)
+        if college_code == NULL_DISPLAY:
+            college_code = None
         if not all([code, name, college_code]):
             QMessageBox.warning(self, "Input Error", "Please fill in all input fields.")
             return
-        try:
-            self.csv.add_program(code, name, college_code)
+        def _done(_):
             QMessageBox.information(self, " Success", "Program added successfully!")
             self.load_programs()
-            self.populate_combo_boxes()
             self.clear_program_form()
-        except ValueError as e:
-            QMessageBox.warning(self, "Error", str(e))
+        self._run_io(lambda: self.csv.add_program(code, name, college_code), _done)
 
     def edit_program_from_table(self):
         selected = self.tablePrograms.currentRow()
@@ -938,21 +3653,17 @@ class EstudyoApp(QtWidgets.QMainWindow):
         if college_code.strip().upper() in ("-NULL-", "NULL"):
             college_code = NULL_DISPLAY
         program = {"code": code, "name": name, "college_code": college_code}
-        colleges = self.csv.read_colleges()
-        dialog = EditProgramDialog(self, program, colleges)
+        dialog = EditProgramDialog(self, program, self.collegePicker)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             data = dialog.get_data()
             if not all([data["code"], data["name"]]):
                 QMessageBox.warning(self, "Input Error", "Please fill in all input fields.")
                 return
-            try:
-                self.csv.edit_program(code, data["code"], data["name"], data["college_code"])
-                QMessageBox.information(self, " Success", "Program updated successfully!")
 
+            def _done(_):
+                QMessageBox.information(self, " Success", "Program updated successfully!")
                 self._refresh_programs_view()
-                self.populate_combo_boxes()
-            except ValueError as e:
-                QMessageBox.warning(self, "Error", str(e))
+            self._run_io(lambda: self.csv.edit_program(code, data["code"], data["name"], data["college_code"]), _done)
 
     def delete_program(self):
         selected = self.tablePrograms.currentRow()
@@ -960,16 +3671,19 @@ class EstudyoApp(QtWidgets.QMainWindow):
             QMessageBox.warning(self, "No Selection", "Please select a program to delete.")
             return
         code = self.tablePrograms.item(selected, 0).text()
-        has_students = self.csv.program_has_students(code)
+        self._run_io(lambda: self.csv.program_has_students(code),
+                     lambda has_students: self._confirm_delete_program(code, has_students))
+
+    def _confirm_delete_program(self, code, has_students):
         msg = (f"Are you sure you want to delete program '{code}'?\n\n"
                + ("  Students enrolled in this program will have their program set to null."
                   if has_students else ""))
         reply = QMessageBox.question(self, "Confirm Delete", msg, QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            self.csv.delete_program(code)
-            QMessageBox.information(self, " Deleted", "Program deleted successfully!")
-            self._refresh_programs_view()
-            self.populate_combo_boxes()
+            def _done(_):
+                QMessageBox.information(self, " Deleted", "Program deleted successfully!")
+                self._refresh_programs_view()
+            self._run_io(lambda: self.csv.delete_program(code), _done)
 
     def clear_program_form(self):
         self.lineProgramCode.clear()
@@ -981,26 +3695,30 @@ class EstudyoApp(QtWidgets.QMainWindow):
         if not value:
             self.load_programs()
             return
-        results = self.csv.search_programs(value)
-        self.load_programs(results)
-        if not results:
-            QMessageBox.information(self, "No Results", "No programs found matching your search.")
+        def _done(results):
+            self.load_programs(results)
+            if not results:
+                QMessageBox.information(self, "No Results", "No programs found matching your search.")
+        # Nothing contains the text as typed: fall back to names within a few typos
+        self._run_io(lambda: self.csv.search_programs(value) or self.csv.fuzzy_search("programs", value), _done)
 
     def sort_programs_table(self):
         field_map = {"Program Code": "code", "Program Name": "name", "College Code": "college_code"}
         field = field_map.get(self.comboSortProgram.currentText(), "code")
-        base = self._current_programs if self._current_programs is not None else self.csv.read_programs()
-        sorted_data = sorted(base, key=lambda p: p.get(field, "").lower())
+        if self._current_programs is None or not self.lineSearchProgram.text().strip():
+            self._run_io(lambda: self.csv.sort_programs(field), self.load_programs)
+            return
+        sorted_data = sorted(self._current_programs, key=lambda p: p.get(field, "").lower())
         self.load_programs(sorted_data)
 
     def _refresh_programs_view(self):
         """Re-apply current search then sort to refresh programs table."""
         value = self.lineSearchProgram.text().strip()
         if value:
-            results = self.csv.search_programs(value)
+            self._run_io(lambda: self.csv.search_programs(value) or self.csv.fuzzy_search("programs", value),
+                         self.load_programs)
         else:
-            results = self.csv.read_programs()
-        self.load_programs(results)
+            self.load_programs()
 
     #  Colleges
     def add_college(self):
@@ -1009,14 +3727,11 @@ class EstudyoApp(QtWidgets.QMainWindow):
         if not all([code, name]):
             QMessageBox.warning(self, "Input Error", "Please fill in all input fields.")
             return
-        try:
-            self.csv.add_college(code, name)
+        def _done(_):
             QMessageBox.information(self, " Success", "College added successfully!")
             self.load_colleges()
-            self.populate_combo_boxes()
             self.clear_college_form()
-        except ValueError as e:
-            QMessageBox.warning(self, "Error", str(e))
+        self._run_io(lambda: self.csv.add_college(code, name), _done)
 
     def edit_college_from_table(self):
         selected = self.tableColleges.currentRow()
@@ -1032,13 +3747,11 @@ class EstudyoApp(QtWidgets.QMainWindow):
             if not all([data["code"], data["name"]]):
                 QMessageBox.warning(self, "Input Error", "Please fill in all input fields.")
                 return
-            try:
-                self.csv.edit_college(code, data["code"], data["name"])
+
+            def _done(_):
                 QMessageBox.information(self, " Success", "College updated successfully!")
                 self._refresh_colleges_view()
-                self.populate_combo_boxes()
-            except ValueError as e:
-                QMessageBox.warning(self, "Error", str(e))
+            self._run_io(lambda: self.csv.edit_college(code, data["code"], data["name"]), _done)
 
     def delete_college(self):
         selected = self.tableColleges.currentRow()
@@ -1046,17 +3759,20 @@ class EstudyoApp(QtWidgets.QMainWindow):
             QMessageBox.warning(self, "No Selection", "Please select a college to delete.")
             return
         code = self.tableColleges.item(selected, 0).text()
-        has_programs = self.csv.college_has_programs(code)
+        self._run_io(lambda: self.csv.college_has_programs(code),
+                     lambda has_programs: self._confirm_delete_college(code, has_programs))
+
+    def _confirm_delete_college(self, code, has_programs):
         msg = (f"Are you sure you want to delete college '{code}'?\n\n"
                + ("  Programs under this college will have their college set to null."
                   if has_programs else ""))
         reply = QMessageBox.question(self, "Confirm Delete", msg,
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            self.csv.delete_college(code)
-            QMessageBox.information(self, " Deleted", "College deleted successfully!")
-            self._refresh_colleges_view()
-            self.populate_combo_boxes()
+            def _done(_):
+                QMessageBox.information(self, " Deleted", "College deleted successfully!")
+                self._refresh_colleges_view()
+            self._run_io(lambda: self.csv.delete_college(code), _done)
 
     def clear_college_form(self):
         self.lineCollegeCode.clear()
@@ -1067,29 +3783,212 @@ class EstudyoApp(QtWidgets.QMainWindow):
         if not value:
             self.load_colleges()
             return
-        results = self.csv.search_colleges(value)
-        self.load_colleges(results)
-        if not results:
-            QMessageBox.information(self, "No Results", "No colleges found matching your search.")
+        def _done(results):
+            self.load_colleges(results)
+            if not results:
+                QMessageBox.information(self, "No Results", "No colleges found matching your search.")
+        self._run_io(lambda: self.csv.search_colleges(value) or self.csv.fuzzy_search("colleges", value), _done)
 
     def sort_colleges_table(self):
         field_map = {"College Code": "code", "College Name": "name"}
         field = field_map.get(self.comboSortCollege.currentText(), "code")
-        base = self._current_colleges if self._current_colleges is not None else self.csv.read_colleges()
-        sorted_data = sorted(base, key=lambda c: c.get(field, "").lower())
+        if self._current_colleges is None or not self.lineSearchCollege.text().strip():
+            self._run_io(lambda: self.csv.sort_colleges(field), self.load_colleges)
+            return
+        sorted_data = sorted(self._current_colleges, key=lambda c: c.get(field, "").lower())
         self.load_colleges(sorted_data)
 
     def _refresh_colleges_view(self):
         """Re-apply current search to refresh colleges table."""
         value = self.lineSearchCollege.text().strip()
         if value:
-            results = self.csv.search_colleges(value)
+            self._run_io(lambda: self.csv.search_colleges(value) or self.csv.fuzzy_search("colleges", value),
+                         self.load_colleges)
         else:
-            results = self.csv.read_colleges()
-        self.load_colleges(results)
+            self.load_colleges()
+
+
+#  Command line
+def run_check(args):
+    manager = CSVManager()
+    issues = manager.check_integrity()
+    for issue in issues:
+        print(f"{issue.table}[{issue.row + 2}] {issue.key}: {issue.problem} -> {issue.describe_fix()}")
+    fixable = sum(1 for i in issues if i.fixable)
+    print(f"{len(issues)} issue(s) found, {fixable} repairable automatically.")
+    if args.repair and fixable:
+        print(f"{manager.repair_integrity()} issue(s) repaired.")
+        issues = manager.check_integrity()
+        if issues:
+            print(f"{len(issues)} issue(s) left to fix by hand.")
+    return 1 if issues else 0
+
+
+def run_changes(args):
+    manager = CSVManager()
+    for event in manager.changes_since(args.since, args.limit):
+        print(json.dumps(event, separators=(",", ":")))
+    return 0
+
+
+def run_history(args):
+    manager = CSVManager()
+    if args.diff:
+        for name, changes in manager.diff_versions(*args.diff).items():
+            for key, before, after in changes:
+                op = "+" if before is None else "-" if after is None else "~"
+                print(f"{op} {name} {key}: {json.dumps(before)} -> {json.dumps(after)}")
+        return 0
+    if args.as_of is None:
+        for cp in manager.history.checkpoints():
+            print(f"seq {cp['seq']:>8}  {datetime.fromtimestamp(cp['ts']):%Y-%m-%d %H:%M:%S}  {cp['file']}")
+        print(f"current seq {manager.feed.last_seq}")
+        return 0
+    when = datetime.fromisoformat(args.as_of)
+    if args.restore:
+        manager.restore_as_of(when)
+        print(f"Restored all tables as of {when}.")
+        return 0
+    tables = manager.tables_as_of(when)
+    os.makedirs(args.out, exist_ok=True)
+    for name, rows in tables.items():
+        path, fieldnames, _ = TABLES[name]
+        manager._write_csv(os.path.join(args.out, os.path.basename(path)), fieldnames, rows)
+        print(f"{name}: {len(rows)} row(s) -> {os.path.join(args.out, os.path.basename(path))}")
+    return 0
+
+
+def run_backup(args):
+    manager = CSVManager()
+    if args.list:
+        for p in manager.backups.points():
+            st = p["stats"]
+            print(f"{p['id']}  {datetime.fromtimestamp(p['ts']):%Y-%m-%d %H:%M:%S}  {len(p['files'])} file(s), "
+                  f"{st['new_chunks']}/{st['chunks']} new chunk(s), {st['new_bytes']} new byte(s)"
+                  + (f"  [{p['label']}]" if p["label"] else ""))
+        return 0
+    if args.restore and args.out:
+        started = time.perf_counter()
+        files = manager.backups.rebuild(args.restore, args.out)
+        print(f"Rebuilt {len(files)} file(s) of backup {args.restore} in {args.out} "
+              f"({time.perf_counter() - started:.2f} s).")
+        return 0
+    if args.restore:
+        manager.restore_backup(args.restore)
+        print(f"Restored all tables from backup {args.restore}.")
+        return 0
+    point = manager.backup(args.label, rotate=False)
+    point["rotated_out"] = manager.backups.rotate(args.keep_last, args.keep_daily, args.keep_weekly)
+    st = point["stats"]
+    print(f"Backup {point['id']}: {st['files']} file(s) ({st['unchanged_files']} unchanged), "
+          f"{st['new_chunks']} of {st['chunks']} chunk(s) new, {st['new_bytes']} byte(s) stored, {st['seconds']} s.")
+    if point["rotated_out"]:
+        print(f"Rotated out: {', '.join(point['rotated_out'])}")
+    return 0
+
+
+def run_shard_students(args):
+    manager = CSVManager()
+    if args.merge:
+        manager.merge_student_shards()
+        print(f"Merged student shards back into {STUDENTS_CSV}.")
+    else:
+        count = manager.shard_students(args.by)
+        print(f"Split {STUDENTS_CSV} into {count} shard(s) by {args.by} under {STUDENT_SHARD_DIR}/.")
+    return 0
+
+
+def run_compress(args):
+    manager = CSVManager()
+    manager.convert_storage(args.format)
+    print(f"Rewrote all tables as {args.format}.")
+    return 0
+
+
+class ChangeFeedHandler(socketserver.StreamRequestHandler):
+    """Local change-feed protocol: the client sends "<seq>\\n" and receives the newer
+    events as JSON lines, then the connection is closed."""
+    def handle(self):
+        try:
+            seq = int(self.rfile.readline().strip() or 0)
+        except ValueError:
+            self.wfile.write(b'{"error":"expected a sequence number"}\n')
+            return
+        for event in self.server.feed.iter_since(seq):
+            self.wfile.write(json.dumps(event, separators=(",", ":")).encode("utf-8") + b"\n")
+
+
+class ChangeFeedServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def run_serve_changes(args):
+    with ChangeFeedServer(("127.0.0.1", args.port), ChangeFeedHandler) as server:
+        server.feed = ChangeFeed()
+        print(f"Serving {CHANGE_LOG} on 127.0.0.1:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+def build_cli():
+    parser = argparse.ArgumentParser(prog="estudyo_app.py", description="Estudyo data tools. Run without arguments to open the app.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    check = commands.add_parser("check", help="check the CSV files for broken keys and references "
+                                   "(exit status 1 while any are left)")
+    check.add_argument("--repair", action="store_true", help="apply the automatic fixes")
+    check.set_defaults(func=run_check)
+
+    changes = commands.add_parser("changes", help="print the change events after a sequence number as JSON lines")
+    changes.add_argument("--since", type=int, default=0, metavar="SEQ", help="last sequence number already seen")
+    changes.add_argument("--limit", type=int, default=None, help="print at most this many events")
+    changes.set_defaults(func=run_changes)
+
+    history = commands.add_parser("history", help="list checkpoints, export or restore a past version, or diff two versions")
+    history.add_argument("--as-of", metavar="TIME", help="ISO date/time of the version, e.g. 2026-10-01T17:00")
+    history.add_argument("--out", default="as_of", help="directory for the exported CSVs (default: as_of)")
+    history.add_argument("--restore", action="store_true", help="replace the live data with the --as-of version")
+    history.add_argument("--diff", nargs=2, type=int, metavar=("FROM_SEQ", "TO_SEQ"), help="row changes between two versions")
+    history.set_defaults(func=run_history)
+
+    backup = commands.add_parser("backup", help="take an incremental backup, list backups, or restore one")
+    backup.add_argument("--label", help="note stored with the backup")
+    backup.add_argument("--list", action="store_true", help="list the kept backups")
+    backup.add_argument("--restore", metavar="ID", help="restore the live data from this backup")
+    backup.add_argument("--out", metavar="DIR", help="with --restore: only rebuild the backup's files in DIR")
+    backup.add_argument("--keep-last", type=int, default=BACKUP_KEEP_LAST)
+    backup.add_argument("--keep-daily", type=int, default=BACKUP_KEEP_DAILY)
+    backup.add_argument("--keep-weekly", type=int, default=BACKUP_KEEP_WEEKLY)
+    backup.set_defaults(func=run_backup)
+
+    compress = commands.add_parser("compress", help="rewrite the table files plain, gzip- or zstd-compressed")
+    compress.add_argument("--format", choices=COMPRESSION_FORMATS, default="gzip")
+    compress.set_defaults(func=run_compress)
+
+    shard = commands.add_parser("shard-students", help="store students as one file per enrolment year or program")
+    shard.add_argument("--by", choices=["year", "program"], default="year")
+    shard.add_argument("--merge", action="store_true", help="go back to a single students.csv")
+    shard.set_defaults(func=run_shard_students)
+
+    serve = commands.add_parser("serve-changes", help="serve the change feed on a local TCP socket")
+    serve.add_argument("--port", type=int, default=CHANGE_FEED_PORT)
+    serve.set_defaults(func=run_serve_changes)
+    return parser, commands
 
 
 def main():
+    parser, commands = build_cli()
+    if len(sys.argv) > 1 and sys.argv[1] in commands.choices:
+        args = parser.parse_args()
+        try:
+            sys.exit(args.func(args))
+        except ValueError as e:
+            parser.exit(1, f"{parser.prog}: error: {e}\n")
+
     app = QtWidgets.QApplication(sys.argv)
     app.setStyle("Fusion")
     win = EstudyoApp()
@@ -0,0 +1,18 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Run in a temp directory holding a copy of the shipped CSV files."""
+    for name in ("colleges.csv", "programs.csv", "students.csv"):
+        shutil.copy(os.path.join(ROOT, name), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,46 @@
+import threading
+
+import estudyo_app as app
+
+
+def _table_bytes():
+    return {name: open(path, "rb").read() for name, (path, _, _) in app.TABLES.items()}
+
+
+def test_restore_backup_taken_before_a_repair(data_dir):
+    original = _table_bytes()
+    manager = app.CSVManager()
+    point = manager.backup()
+    manager.repair_integrity()
+    assert _table_bytes() != original
+
+    manager.restore_backup(point["id"])
+    manager.flush()
+
+    assert _table_bytes() == original
+    assert manager.undo() == f"Restore backup {point['id']}"
+    assert not any(i.fixable for i in manager.check_integrity())
+
+
+def test_rotation_waits_for_a_backup_in_progress(data_dir):
+    manager = app.CSVManager()
+    manager.backup()
+    # Another program rotating everything out, while the next backup reuses the chunks
+    rotator = threading.Thread(target=app.BackupStore().rotate, args=(0, 0, 0))
+    store = manager.backups.backup
+
+    def store_while_rotating(files, label=None):
+        assert any(data is None for _, data in files.values())
+        rotator.start()
+        rotator.join(0.2)
+        assert rotator.is_alive()
+        return store(files, label)
+
+    manager.backups.backup = store_while_rotating
+    try:
+        with manager.backups.lock():
+            point = manager.backup(rotate=False)
+            assert manager.backups.rebuild(point["id"], str(data_dir / "rebuilt"))
+    finally:
+        rotator.join()
+    assert manager.backups.points() == []
@@ -0,0 +1,32 @@
+import estudyo_app as app
+
+
+def _commit(feed, key):
+    changes = {"colleges": [(key, None, None, 0, {"code": key, "name": key})]}
+    with feed.lock():
+        feed.append([feed.make_events("Add", changes)])
+
+
+def test_writers_sharing_a_log_get_one_sequence(data_dir):
+    first, second = app.ChangeFeed(), app.ChangeFeed()
+    _commit(first, "AAA")
+    _commit(second, "BBB")
+    _commit(first, "CCC")
+
+    assert [e["seq"] for e in first.since(0)] == [1, 2, 3]
+    assert [e["key"] for e in first.since(1)] == ["BBB", "CCC"]
+    assert (first.last_seq, second.last_seq) == (3, 2)
+
+
+def test_torn_last_line_is_skipped_then_cut_off(data_dir):
+    feed = app.ChangeFeed()
+    _commit(feed, "AAA")
+    with open(app.CHANGE_LOG, "a", encoding="utf-8") as f:
+        f.write('{"seq":2,"ts":1,"label":"Ad')
+
+    manager = app.CSVManager()
+    assert manager.feed.last_seq == 1
+    assert [e["key"] for e in manager.changes_since(0)] == ["AAA"]
+
+    manager.add_college("DDD", "College D")
+    assert [(e["seq"], e["key"]) for e in manager.changes_since(0)] == [(1, "AAA"), (2, "DDD")]
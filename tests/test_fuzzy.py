@@ -0,0 +1,15 @@
+import pytest
+
+import estudyo_app as app
+
+ROWS = [{"id": f"2024-000{i}", "first_name": first, "last_name": last}
+        for i, (first, last) in enumerate([("Juan", "Reyes"), ("Maria", "Cruz"), ("Jose", "Lumasag")])]
+
+
+@pytest.mark.parametrize("query, last_name", [
+    ("reeys", "Reyes"), ("ryees", "Reyes"), ("Reyse", "Reyes"),
+    ("crzu", "Cruz"), ("lumasga", "Lumasag"), ("lumsaag", "Lumasag"),
+])
+def test_typos_and_transpositions_find_the_name(query, last_name):
+    index = app.FuzzyIndex(ROWS, "id", ("first_name", "last_name"))
+    assert [row["last_name"] for _, row in index.search(query)] == [last_name]
@@ -0,0 +1,77 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import estudyo_app as app
+
+
+def test_restore_as_of_before_repair(data_dir):
+    manager = app.CSVManager()
+    programs = manager.read_programs()
+    time.sleep(0.01)
+    when = time.time()
+    time.sleep(0.01)
+    manager.repair_integrity()
+
+    manager.restore_as_of(when)
+
+    assert manager.read_programs() == programs
+    assert app.CSVManager().read_programs() == programs
+
+
+def test_as_of_read_stops_at_the_target(data_dir, monkeypatch):
+    feed = app.ChangeFeed()
+    history = app.History(feed)
+    history.checkpoint(0, {"colleges": [], "programs": [], "students": []})
+    with feed.lock():
+        feed.append([feed.make_events("Add", {"colleges": [(f"C{i}", None, None, i, {"code": f"C{i}", "name": ""})]})
+                     for i in range(500)])
+    parsed = []
+    parse = app.ChangeFeed._parse
+    monkeypatch.setattr(app.ChangeFeed, "_parse", staticmethod(lambda line: parsed.append(line) or parse(line)))
+
+    tables = history.at(seq=10)
+
+    assert [c["code"] for c in tables["colleges"]] == [f"C{i}" for i in range(10)]
+    assert len(parsed) < 20
+
+
+def test_checkpoints_come_from_commits_only(data_dir):
+    manager = app.CSVManager()
+    manager.check_integrity()
+    assert manager.history.checkpoints() == []
+
+    manager.add_college("XYZ", "College X")
+
+    assert [cp["seq"] for cp in manager.history.checkpoints()] == [0]
+    assert len(manager.history.at(seq=0)["colleges"]) == len(manager.read_colleges()) - 1
+
+
+def test_checkpoint_is_taken_before_other_programs_log_more(data_dir):
+    manager, other = app.CSVManager(), app.CSVManager()
+    manager.add_college("XYZ", "College X")
+    manager.history.interval = 1
+    replace, lock = manager._replace_files, manager.feed.lock
+    writer = threading.Thread(target=other.add_college, args=("OTH", "Elsewhere"))
+
+    def replace_then_let_other_write(pending):
+        replace(pending)
+        writer.start()
+
+    @contextmanager
+    def lock_after_other():
+        if writer.ident is not None:
+            writer.join()  # the other program gets the log lock first
+        with lock():
+            yield
+
+    manager._replace_files = replace_then_let_other_write
+    manager.feed.lock = lock_after_other
+    try:
+        manager.add_college("ABC", "College A")
+    finally:
+        writer.join()
+
+    cp = manager.history.checkpoints()[-1]
+    codes = [c["code"] for c in manager.history.at(seq=cp["seq"])["colleges"]]
+    assert cp["seq"] == 2 and "ABC" in codes and "OTH" not in codes
@@ -0,0 +1,58 @@
+import argparse
+import csv
+
+import estudyo_app as app
+
+
+def _duplicate_first_row(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        fieldnames, rows = reader.fieldnames, list(reader)
+    rows.append(dict(rows[0]))
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_repair_removes_exact_duplicate_row(data_dir):
+    _duplicate_first_row("students.csv")
+    manager = app.CSVManager()
+    count = len(manager.read_students())
+    assert any(i.problem == "Exact duplicate row" for i in manager.check_integrity())
+
+    manager.repair_integrity()
+
+    assert len(manager.read_students()) == count - 1
+    assert len(app.CSVManager().read_students()) == count - 1
+    assert not any(i.problem == "Exact duplicate row" for i in manager.check_integrity())
+
+
+def test_diff_of_dropped_duplicate_round_trips():
+    a = {"code": "A", "name": "x"}
+    b = {"code": "B", "name": "y"}
+    before = [a, b, dict(a)]
+    after = [a, b]
+    diff = app._diff_rows("code", before, after)
+    assert diff == [("A", 2, a, None, None)]
+    assert app._apply_diff("code", before, diff) == after
+    assert app._apply_diff("code", after, diff, inverse=True) == before
+
+
+def test_repair_can_be_undone_and_redone(data_dir):
+    manager = app.CSVManager()
+    before = manager.read_programs()
+    assert manager.repair_integrity() == 2
+
+    assert manager.undo() == "Repair data"
+    assert manager.read_programs() == before
+    assert {p["college_code"] for p in manager.read_programs()} >= {" CSM", "CN"}
+
+    assert manager.redo() == "Repair data"
+    assert not any(i.fixable for i in manager.check_integrity())
+
+
+def test_check_repair_fails_while_issues_are_left(data_dir, capsys):
+    args = argparse.Namespace(repair=True)
+    assert app.run_check(args) == 1
+    assert "left to fix by hand" in capsys.readouterr().out
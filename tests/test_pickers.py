@@ -0,0 +1,50 @@
+import estudyo_app as app
+
+
+def _picker(manager):
+    picker = app.CodePickerModel()
+    picker.set_rows(manager.read_programs())
+    changes = []
+    manager.add_listener(changes.append)
+    return picker, changes
+
+
+def test_picker_follows_rename_and_delete(data_dir):
+    manager = app.CSVManager()
+    picker, changes = _picker(manager)
+    manager.edit_program("BSIT", "BSINFOTECH", "Information Technology", "CCS")
+    manager.delete_program("BSCS")
+
+    assert all(picker.apply_diff(c["programs"]) for c in changes)
+    assert picker.labels() == [f"{p['code']} - {p['name']}" for p in manager.read_programs()]
+    assert picker.row_of("bsinfotech") == 0 and picker.row_of("BSIT") == picker.row_of("BSCS") == -1
+
+
+def test_picker_refuses_diff_for_codes_it_does_not_hold(data_dir):
+    manager = app.CSVManager()
+    picker, changes = _picker(manager)
+    manager.add_program("BSX", "Something", "CCS")
+    picker.set_rows(manager.read_programs()[1:])  # out of date
+    labels = picker.labels()
+    manager.edit_program("BSIT", "BSIT", "Renamed", "CCS")
+    manager.edit_program("BSX", "BSX", "Renamed", "CCS")
+
+    assert not picker.apply_diff(changes[1]["programs"])
+    assert picker.apply_diff(changes[2]["programs"])
+    assert not picker.apply_diff(changes[0]["programs"])  # BSX is already there
+    assert picker.labels()[:-1] == labels[:-1] and picker.labels()[-1] == "BSX - Renamed"
+
+
+def test_reload_listener_sees_tables_changed_on_disk(data_dir):
+    manager = app.CSVManager()
+    reloaded = []
+    manager.add_reload_listener(reloaded.append)
+    manager.read_programs()
+    manager.add_program("BSX", "Something", "CCS")
+    assert reloaded == []
+
+    other = app.CSVManager()
+    other.edit_program("BSIT", "BSIT", "Changed elsewhere", "CCS")
+    other.flush()
+    manager.edit_program("BSCS", "BSCS", "Changed here", "CCS")
+    assert reloaded == [["programs"]]
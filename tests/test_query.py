@@ -0,0 +1,33 @@
+import pytest
+
+import estudyo_app as app
+
+
+def test_aliases_resolve_to_student_columns():
+    assert app.parse_query("program = BSCS AND year = 3 AND last contains ab") == [
+        ("program_code", "=", "BSCS"), ("year_level", "=", "3"), ("last_name", "contains", "ab")]
+    assert set(app.QUERY_FIELD_ALIASES.values()) <= set(app.TABLES["students"][1])
+
+
+def test_college_is_not_a_student_field():
+    with pytest.raises(ValueError, match="Unknown field 'college'"):
+        app.parse_query("college = CCS")
+
+
+def test_id_search_skips_other_shards_once_students_are_loaded(data_dir, monkeypatch):
+    manager = app.CSVManager(flush_interval_ms=60000, flush_max_ops=100)
+    manager.shard_students("year")
+    students = manager.read_students()
+    read = []
+    iter_rows = app.ShardedTable.iter_rows
+    monkeypatch.setattr(app.ShardedTable, "iter_rows", lambda self, keys=None: read.append(keys) or iter_rows(self, keys))
+
+    found = manager.search_students("id", "2024-")
+    assert read == [["2024"]]
+    assert found == [s for s in students if "2024-" in s["id"]]
+
+    # Unflushed commits are only in memory, so the search goes through them instead
+    manager.delete_student(found[0]["id"])
+    assert manager.search_students("id", "2024-") == found[1:]
+    assert read == [["2024"]]
+    manager.flush()
@@ -0,0 +1,23 @@
+import sys
+from array import array
+
+import estudyo_app as app
+
+
+def test_key_strings_count_against_the_budget():
+    cache = app.ResultCache(max_bytes=10**6)
+    key = ("students", ("query", ("last_name", "contains", "x" * 5000)), None)
+    cache.put(key, 1, array("i", [1, 2, 3]))
+    assert cache.stats()["bytes"] > 5000 + sys.getsizeof(array("i", [1, 2, 3]))
+
+
+def test_commit_drops_results_of_the_old_version(data_dir):
+    manager = app.CSVManager()
+    manager.search_students("id", "2024")
+    manager.search_colleges("c")
+    assert manager.results.stats()["entries"] == 2
+
+    manager.add_student("2024-9999", "A", "B", "Male", "BSCS", "1")
+
+    stats = manager.results.stats()
+    assert (stats["entries"], stats["stale"]) == (1, 1)
@@ -0,0 +1,34 @@
+import threading
+
+import estudyo_app as app
+
+
+def test_index_build_does_not_block_commits(data_dir):
+    manager = app.CSVManager()
+    building, release = threading.Event(), threading.Event()
+
+    def slow_build(rows):
+        building.set()
+        release.wait(5)
+        return len(rows)
+
+    def reader():
+        with manager.snapshot() as snap:
+            results.append(snap.index("students", "slow", slow_build))
+
+    results = []
+    thread = threading.Thread(target=reader)
+    committed = threading.Thread(target=manager.add_college, args=("XYZ", "College X"))
+    thread.start()
+    try:
+        assert building.wait(5)
+        committed.start()
+        committed.join(2)
+        assert not committed.is_alive()
+    finally:
+        # Never leave a thread behind to write after the test left data_dir
+        release.set()
+        thread.join(5)
+        if committed.is_alive():
+            committed.join(5)
+    assert results == [len(manager.read_students())]
@@ -0,0 +1,39 @@
+import pytest
+
+import estudyo_app as app
+
+
+def test_row_edits_diff_like_a_whole_table_rewrite(data_dir):
+    manager = app.CSVManager()
+    before = manager.read_students()
+    first, second, third = (s["id"] for s in before[:3])
+    with manager.transaction("Mixed"):
+        manager.edit_student(first, "9999-0001", "A", "B", "Male", "BSCS", "1")
+        manager.delete_student(second)
+        manager.add_student("9999-0002", "C", "D", "Female", "BSCS", "2")
+        manager.promote_students([third, "9999-0002"])
+    after = manager.read_students()
+
+    assert [s["id"] for s in after[:2]] == ["9999-0001", third]
+    assert after[-1]["year_level"] == "3"
+    diff = manager._undo_stack[-1].changes["students"]
+    assert sorted(diff, key=repr) == sorted(app._diff_rows("id", before, after), key=repr)
+    assert app.CSVManager().read_students() == after
+    assert manager.undo() == "Mixed"
+    assert manager.read_students() == before
+
+
+def test_row_edits_reject_taken_keys(data_dir):
+    manager = app.CSVManager()
+    first, second = (s["id"] for s in manager.read_students()[:2])
+    with pytest.raises(ValueError):
+        manager.edit_student(first, second, "A", "B", "Male", "BSCS", "1")
+    with pytest.raises(ValueError, match="Duplicate"), manager.transaction():
+        manager.edit_student(first, "9999-0001", "A", "B", "Male", "BSCS", "1")
+        manager.add_student("9999-0003", "C", "D", "Female", "BSCS", "2")
+        manager._put_row("students", "9999-0003", dict(manager._get_row("students", "9999-0003"), id=second))
+    # A freed key can be taken in the same commit
+    with manager.transaction():
+        manager.delete_student(first)
+        manager.add_student(first, "E", "F", "Male", "BSIT", "1")
+    assert manager.read_students()[-1]["first_name"] == "E"